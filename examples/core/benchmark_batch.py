@@ -0,0 +1,116 @@
+from typing import Optional
+from os.path import join, dirname
+from sys import argv
+from time import time, sleep
+import numpy as np
+from vedo import Mesh
+
+from SimRender.core import Viewer, BatchRunner
+
+
+file = lambda f: join(dirname(__file__), 'data', f)
+
+
+class SmoothingSimulation:
+
+    def __init__(self, index: int, nb_iterations: int = 20):
+        """
+        CPU-bound synthetic simulation: Laplacian smoothing of a randomly perturbed heart mesh.
+
+        :param index: Index of the simulation in the batch (seed of the perturbation).
+        :param nb_iterations: Number of smoothing iterations per step.
+        """
+
+        self.nb_iterations = nb_iterations
+        mesh = Mesh(inputobj=file('heart.obj')).triangulate()
+        self.cells = np.array(mesh.cells)
+        self.rest = np.array(mesh.vertices)
+        self.positions = self.rest.copy()
+        self.rng = np.random.default_rng(seed=index)
+
+        # Neighbors of each vertex (from the edges of the triangles)
+        edges = np.concatenate([self.cells[:, [0, 1]], self.cells[:, [1, 2]], self.cells[:, [2, 0]]])
+        edges = np.concatenate([edges, edges[:, ::-1]])
+        self.edges = edges
+        self.degree = np.bincount(edges[:, 0], minlength=len(self.rest))[:, None]
+        self.viewer: Optional[Viewer] = None
+
+    def init_viewer(self, viewer: Viewer) -> None:
+
+        self.viewer = viewer
+        self.viewer.objects.add_mesh(positions=self.positions, cells=self.cells, colormap='jet',
+                                     colormap_field=np.zeros(len(self.positions)), colormap_range=np.array([0., 1.]))
+
+    def step(self) -> None:
+
+        # Perturb the mesh, then smooth it
+        self.positions = self.rest + self.rng.normal(scale=0.5, size=self.rest.shape)
+        for _ in range(self.nb_iterations):
+            neighbors = np.zeros_like(self.positions)
+            np.add.at(neighbors, self.edges[:, 0], self.positions[self.edges[:, 1]])
+            self.positions = 0.5 * self.positions + 0.5 * neighbors / self.degree
+        displacement = np.linalg.norm(self.positions - self.rest, axis=1)
+        if self.viewer is not None:
+            self.viewer.objects.update_mesh(object_id=0, positions=self.positions,
+                                            colormap_field=displacement / max(displacement.max(), 1e-9))
+
+
+def sequential(nb_simu: int, nb_steps: int) -> float:
+    """
+    Run the simulations one after the other in the current process (without rendering).
+
+    :return: Number of steps per second for the whole batch.
+    """
+
+    simulations = [SmoothingSimulation(index=i) for i in range(nb_simu)]
+    start = time()
+    for _ in range(nb_steps):
+        for simulation in simulations:
+            simulation.step()
+    return nb_simu * nb_steps / (time() - start)
+
+
+def parallel(nb_simu: int, nb_steps: int, render: bool) -> float:
+    """
+    Run each simulation in its own process (rendered in a single batch viewer if required).
+
+    :return: Number of steps per second for the whole batch.
+    """
+
+    runner = BatchRunner(simulation=SmoothingSimulation, nb_simu=nb_simu, render=render, grid=True,
+                         viewer_options={'sync': False})
+    runner.start(nb_steps=nb_steps)
+
+    # Only the stepping phase is measured, while every simulation is computing its steps (the creation of the
+    # simulations, the end of the processes and the rendering window lifetime are not measured)
+    while min(runner.steps) == 0 and runner.is_running:
+        sleep(1e-3)
+    start, steps = time(), sum(runner.steps)
+    while max(runner.steps) < nb_steps and runner.is_running:
+        sleep(1e-3)
+    throughput = (sum(runner.steps) - steps) / (time() - start)
+
+    errors = runner.wait()
+    for index, error in {**errors, **runner.stop(close_window=True)}.items():
+        print(f'Simulation {index} failed:\n{error}')
+    return throughput
+
+
+if __name__ == '__main__':
+
+    # Usage: python benchmark_batch.py [--render]
+    # A simulation per core: without rendering, the processes are compared with a sequential loop over the same
+    # simulations. With rendering, the throughput is compared with the rendered batch of a single simulation.
+    render = '--render' in argv
+    nb_steps = 100
+
+    reference = None
+    for nb_simu in [1, 2, 4, 8]:
+        par = parallel(nb_simu=nb_simu, nb_steps=nb_steps, render=render)
+        if render:
+            reference = par if reference is None else reference
+            print(f'{nb_simu} processes | rendered={par:7.1f} steps/s | scaling={par / reference:.2f}x')
+        else:
+            seq = sequential(nb_simu=nb_simu, nb_steps=nb_steps)
+            print(f'{nb_simu} processes | sequential={seq:7.1f} steps/s | processes={par:7.1f} steps/s | '
+                  f'speed-up={par / seq:.2f}x')
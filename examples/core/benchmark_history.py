@@ -0,0 +1,64 @@
+from os.path import join, dirname, exists
+from time import time
+import numpy as np
+from vedo import Mesh
+
+from SimRender.core.remote.history import Storage, History
+
+
+file = lambda f: join(dirname(__file__), 'data', f)
+
+
+def load_data():
+    """
+    Load the recorded positions of the heart and vessels meshes.
+    The vessels deformations are generated from the heart ones if they were not recorded.
+    """
+
+    heart = np.load(file=file('heart.npy'))
+    if exists(file('vessels.npy')):
+        vessels = np.load(file=file('vessels.npy'))
+    else:
+        vertices = Mesh(inputobj=file('vessels.obj')).vertices
+        heart_disp = heart - heart[0]
+        closest = np.linalg.norm(vertices[:, None] - heart[0][None, :], axis=2).argmin(axis=1)
+        vessels = vertices[None] + heart_disp[:, closest]
+    return {'heart': heart, 'vessels': vessels}
+
+
+def benchmark(name: str, positions: np.ndarray, precision: float, nb_seek: int = 1000) -> None:
+    """
+    Record the positions in a History, then measure the compression ratio, the error and the seek time.
+    """
+
+    storage = Storage(precision=precision)
+    history = History(storage=storage, shape=positions.shape[1:], dtype=positions.dtype)
+
+    # Record (the last chunk is only written once full, so the run is repeated to fill the chunks)
+    nb_frames = len(positions) * 10
+    start = time()
+    for frame in range(nb_frames):
+        history.append(frame=frame, value=positions[frame % len(positions)])
+    storage.flush()
+    record_time = (time() - start) / nb_frames
+    raw, stored = history.sizes
+
+    # Random seeks (cold and warm cache)
+    frames = np.random.randint(0, nb_frames, nb_seek)
+    error = max(np.abs(history.get(frame=f) - positions[f % len(positions)]).max() for f in frames[:100])
+    start = time()
+    for f in frames:
+        history.get(frame=f)
+    seek_time = (time() - start) / nb_seek
+
+    print(f'{name:>8} | precision={precision:.0e} | ratio={raw / max(1, stored):6.2f}x | '
+          f'max error={error:.2e} (amplitude={np.abs(positions).max():.2f}) | '
+          f'record={record_time * 1e3:.3f}ms | seek={seek_time * 1e3:.3f}ms')
+    storage.close()
+
+
+if __name__ == '__main__':
+
+    for name, data in load_data().items():
+        for p in [0., 1e-6, 1e-5, 1e-4]:
+            benchmark(name=name, positions=data, precision=p)
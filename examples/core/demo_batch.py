@@ -9,9 +9,9 @@ if __name__ == '__main__':
     nb_simu = 5
     batch_keys = batch.start(nb_view=nb_simu)
 
-    # Create the simulations and the viewers (sync is not available in batch mode)
+    # Create the simulations and the viewers (in batch mode, only the visible simulations wait for the rendering)
     simu = [Simulation() for _ in range(nb_simu)]
-    viewer = [Viewer(sync=False) for _ in range(nb_simu)]
+    viewer = [Viewer(sync=True, batch_lag=2) for _ in range(nb_simu)]
 
     # Init the visualization for each simulation
     for i in range(nb_simu):
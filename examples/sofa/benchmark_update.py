@@ -0,0 +1,59 @@
+from typing import Tuple
+from sys import argv
+from time import time
+from importlib import import_module
+import Sofa
+
+from SimRender.sofa.local.factory import Factory
+
+
+def create(scene: str) -> Tuple[Sofa.Core.Node, Factory]:
+    """
+    Create the SOFA scene graph and the visual objects of a scene (the remote viewer is not launched).
+    """
+
+    root = Sofa.Core.Node()
+    root.addObject(import_module(scene).Simulation(root))
+    Sofa.Simulation.init(root)
+    factory = Factory(root_node=root, sync=False)
+    factory.objects.add_scene_graph(visual_models=True,
+                                    behavior_models=scene != 'tripod',
+                                    force_fields=True,
+                                    collision_models=True)
+    return root, factory
+
+
+def benchmark(scene: str, nb_steps: int = 200) -> None:
+    """
+    Measure the time spent to update the shared memories from the SOFA Data fields at each step, compared to the
+    time of the simulation step.
+    """
+
+    root, factory = create(scene=scene)
+
+    # Time of the SOFA steps and of the updates of the shared memories
+    simulation_time, update_time = 0., 0.
+    for _ in range(nb_steps):
+        start = time()
+        Sofa.Simulation.animate(root, root.dt.value)
+        simulation_time += time() - start
+        start = time()
+        factory.update()
+        update_time += time() - start
+
+    print(f'{scene:>9} | {len(factory.memories)} objects | simulation={simulation_time / nb_steps * 1e3:.3f}ms | '
+          f'update={update_time / nb_steps * 1e3:.3f}ms')
+
+    # Slowest data wrapper callbacks
+    timings = sorted(factory.timings.items(), key=lambda item: -item[1]['time'])
+    for object_id, timing in timings[:3]:
+        print(f'{"":>9} | object {object_id} ({timing["name"]}) | {timing["time"] / timing["calls"] * 1e3:.3f}ms')
+    factory.close()
+
+
+if __name__ == '__main__':
+
+    # Usage: python benchmark_update.py [caduceus|tripod]
+    scenes = [argv[1].lower()] if len(argv) == 2 else ['caduceus', 'tripod']
+    for s in scenes:
+        benchmark(scene=s)
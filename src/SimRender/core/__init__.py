@@ -1,3 +1,4 @@
 from SimRender.core.local.viewer import Viewer
 from SimRender.core.local.viewer_batch import ViewerBatch
 from SimRender.core.local.player import Player
+from SimRender.core.local.batch_runner import BatchRunner
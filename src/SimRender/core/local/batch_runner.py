@@ -0,0 +1,180 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from multiprocessing import get_context
+from threading import Thread, Semaphore
+from traceback import format_exc
+
+from SimRender.core.local.viewer import Viewer
+from SimRender.core.local.viewer_batch import ViewerBatch
+
+
+def _run_member(create: Callable[[int], Any],
+                index: int,
+                batch_key: Optional[Tuple[int, int]],
+                nb_steps: Optional[int],
+                viewer_options: Dict[str, Any],
+                stop: Any,
+                steps: Any,
+                errors: Any) -> None:
+    """
+    Run a simulation of the batch in its own python process.
+
+    :param create: Function creating the simulation of a given index.
+    :param index: Index of the simulation in the batch.
+    :param batch_key: Key of the batch viewer (no rendering if None).
+    :param nb_steps: Number of steps to run (until the batch is stopped if None).
+    :param viewer_options: Options of the local Viewer.
+    :param stop: Shared event to stop the simulation.
+    :param steps: Shared array of the steps counters.
+    :param errors: Shared queue to report the exceptions raised by the simulation.
+    """
+
+    viewer: Optional[Viewer] = None
+    try:
+        # Create the simulation and its viewer
+        simulation = create(index)
+        viewer = Viewer(**viewer_options)
+        simulation.init_viewer(viewer)
+        if batch_key is not None:
+            viewer.launch(batch_key=batch_key)
+
+        # Run the steps until the batch is stopped or the rendering window is closed
+        while not stop.is_set() and (nb_steps is None or steps[index] < nb_steps) and viewer.is_open:
+            simulation.step()
+            if batch_key is not None:
+                viewer.render()
+            steps[index] += 1
+
+    except Exception:
+        errors.put((index, format_exc()))
+
+    finally:
+        if viewer is not None:
+            viewer.shutdown()
+
+
+class BatchRunner:
+
+    def __init__(self,
+                 simulation: Callable[[int], Any],
+                 nb_simu: int,
+                 processes: Optional[int] = None,
+                 render: bool = True,
+                 viewer_options: Optional[Dict[str, Any]] = None,
+                 **batch_options):
+        """
+        This class runs several simulations in parallel python processes, rendered in a single ViewerBatch.
+        Each simulation runs in its own process so that a failing simulation does not stop the other ones.
+
+        :param simulation: Function (or class) creating the simulation of a given index. It must be importable by the
+                           child processes. The simulation must implement 'init_viewer(viewer)' to create its 3D
+                           objects and 'step()' to compute a time step and update its 3D objects.
+        :param nb_simu: Number of simulations in the batch.
+        :param processes: Maximum number of simulations running at the same time (all of them by default).
+        :param render: If False, the simulations are not rendered (the viewers are not launched).
+        :param viewer_options: Options of the local Viewer of each simulation.
+        :param batch_options: Options of the ViewerBatch (grid, link_cameras, fps, inactive_fps, ensemble).
+        """
+
+        self.__simulation = simulation
+        self.__nb_simu = nb_simu
+        self.__processes = nb_simu if processes is None else max(1, processes)
+        self.__viewer_options = {} if viewer_options is None else viewer_options
+        self.__batch = ViewerBatch(**batch_options) if render else None
+
+        # Shared state of the simulations processes
+        self.__context = get_context('spawn')
+        self.__stop = self.__context.Event()
+        self.__steps = self.__context.Array('q', nb_simu, lock=False)
+        self.__errors = self.__context.Queue()
+        self.__launcher: Optional[Thread] = None
+
+    @property
+    def steps(self) -> List[int]:
+        """
+        Get the number of steps computed by each simulation.
+        """
+
+        return list(self.__steps)
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Check if some simulations processes are still running.
+        """
+
+        return self.__launcher is not None and self.__launcher.is_alive()
+
+    def start(self, nb_steps: Optional[int] = None) -> None:
+        """
+        Launch the rendering window, then launch the simulations processes.
+
+        :param nb_steps: Number of steps to run for each simulation (until stop() is called if None).
+        """
+
+        batch_keys = self.__batch.start(nb_view=self.__nb_simu) if self.__batch is not None else [None] * self.__nb_simu
+
+        def __launch():
+
+            # Launch a process per simulation, with a bounded number of running processes
+            slots = Semaphore(self.__processes)
+            processes = []
+            for index, batch_key in enumerate(batch_keys):
+                slots.acquire()
+                if self.__stop.is_set():
+                    break
+                process = self.__context.Process(target=_run_member,
+                                                 args=(self.__simulation, index, batch_key, nb_steps,
+                                                       self.__viewer_options, self.__stop, self.__steps,
+                                                       self.__errors),
+                                                 daemon=True)
+                process.start()
+                processes.append(process)
+                Thread(target=lambda p=process, i=index: (p.join(), self.__exited(index=i, process=p),
+                                                          slots.release()), daemon=True).start()
+            for process in processes:
+                process.join()
+
+        self.__launcher = Thread(target=__launch, daemon=True)
+        self.__launcher.start()
+
+    def __exited(self, index: int, process: Any) -> None:
+        """
+        Report the simulations processes that crashed without raising a python exception.
+
+        :param index: Index of the simulation in the batch.
+        :param process: Process of the simulation.
+        """
+
+        if process.exitcode not in (0, None):
+            self.__errors.put((index, f'Process exited with code {process.exitcode}'))
+
+    def wait(self) -> Dict[int, str]:
+        """
+        Wait for the simulations processes to end.
+
+        :return: Errors of the failed simulations with format {index: traceback}.
+        """
+
+        if self.__launcher is not None:
+            self.__launcher.join()
+            self.__launcher = None
+        errors = {}
+        while not self.__errors.empty():
+            index, error = self.__errors.get()
+            errors[index] = error
+        return errors
+
+    def stop(self, close_window: bool = False) -> Dict[int, str]:
+        """
+        Stop the simulations, then wait for the rendering window to be closed.
+
+        :param close_window: If True, the rendering window is closed once the simulations are stopped, without waiting
+                             for the user.
+        :return: Errors of the failed simulations with format {index: traceback}.
+        """
+
+        self.__stop.set()
+        errors = self.wait()
+        if self.__batch is not None:
+            self.__batch.stop(close=close_window)
+        return errors
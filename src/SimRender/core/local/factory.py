@@ -1,8 +1,9 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR
 from multiprocessing.shared_memory import SharedMemory
 from time import sleep
-from numpy import array, ndarray, nan
+from math import floor
+from numpy import array, ndarray, nan, uint8, float32
 
 from SimRender.core.local.memory import Memory
 from SimRender.core.utils import flat_mesh_cells
@@ -10,16 +11,20 @@ from SimRender.core.utils import flat_mesh_cells
 
 class Factory:
 
-    def __init__(self, sync: bool):
+    def __init__(self, sync: bool, capture_size: Optional[Tuple[int, int]] = None, batch_lag: int = 0):
         """
         This class is used to manage the communication with the visualization process.
         It creates and update the visualization data in shared memories.
 
         :param sync: If True, the update call is synchronized with the end of the remote rendering step.
+        :param capture_size: If defined, size (width, height) of the shared image buffers used to capture the
+                             rendered images.
+        :param batch_lag: Maximum number of steps between the simulation and the rendering with sync in batch mode.
         """
 
-        # Create the shared memories container
-        self.memories: List[Memory] = []
+        # Create the shared memories container (the memories of the removed visual objects are replaced by None so that
+        # the IDs of the other visual objects remain valid)
+        self.memories: List[Optional[Memory]] = []
 
         # Create the visual object API
         self.objects = Objects(factory=self)
@@ -28,37 +33,74 @@ class Factory:
         self.__socket = socket(AF_INET, SOCK_STREAM)
         self.__socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
         self.__remote: Optional[socket] = None
+        self.__batch_key: Optional[Tuple[int, int]] = None
 
         # Define the synchronization function if required, otherwise add a manual delay (minimal synchronization)
         self.__sync_fct = self.__sync if sync else lambda: sleep(1e-6)
-        # Create a shared numpy array for synchronization with format [do_exit, do_synchronize, step_counter]
-        sync_array = array([0, 0, 0], dtype=int)
+        # Create a shared numpy array for synchronization with format [do_exit, do_synchronize, step_counter,
+        # do_capture, do_record, rendered_step, is_visible, structure_counter, applied_structures]
+        self.__batch_lag = max(0, batch_lag)
+        sync_array = array([0, 0, 0, 0, 1, 0, 1, 0, 0], dtype=int)
         self.__sync_sm = SharedMemory(create=True, size=sync_array.nbytes)
         self.__sync_arr = ndarray(shape=sync_array.shape, dtype=sync_array.dtype, buffer=self.__sync_sm.buf)
         self.__sync_arr[...] = sync_array[...]
 
+        # Create a shared numpy array for the simulation time of the current step (NaN if not provided)
+        self.__time_sm = SharedMemory(create=True, size=8, name=f'{self.__sync_sm.name}_time')
+        self.__time_arr = ndarray(shape=(1,), dtype=float, buffer=self.__time_sm.buf)
+        self.__time_arr[0] = nan
+
+        # Recording policy of the remote history (every step is recorded by default)
+        self.__record_stride = 1
+        self.__record_period: Optional[float] = None
+        self.__record_bucket: Optional[int] = None
+
+        # Create the shared image buffers (RGB and depth) in which the remote process reads back the render window
+        self.__capture_sm: List[SharedMemory] = []
+        self.__capture_arr: List[ndarray] = []
+        if capture_size is not None:
+            width, height = capture_size
+            rgb_sm = SharedMemory(create=True, size=width * height * 3)
+            depth_sm = SharedMemory(create=True, size=width * height * 4, name=f'{rgb_sm.name}_depth')
+            self.__capture_sm = [rgb_sm, depth_sm]
+            self.__capture_arr = [ndarray(shape=(height, width, 3), dtype=uint8, buffer=rgb_sm.buf),
+                                  ndarray(shape=(height, width), dtype=float32, buffer=depth_sm.buf)]
+
+        # Visual objects added or removed since the remote viewer was connected (structural changes of the scene)
+        self.__nb_shared = 0
+        self.__removed: List[int] = []
+        self.__freed: List[Tuple[int, int]] = []
+
     @property
     def is_open(self) -> bool:
         return self.__sync_arr[0] == 0
 
-    def init(self, batch_key: Optional[int]) -> int:
+    def init(self, batch_key: Optional[Tuple[int, int]]) -> int:
         """
         Initialize the local socket.
 
+        :param batch_key: Batch key with format (batch_port, index) in batch mode.
         :return: Available port number of the socket.
         """
 
         # Case 1: Non-batch mode, get an available socket port
         if batch_key is None:
             self.__socket.bind(('localhost', 0))
-        # Case 2: Batch mode, bind to the defined key
+        # Case 2: Batch mode, the socket will connect to the endpoint of the batch
         else:
-            # Disable sync for batch mode
+            # Sync in batch mode: the visible simulations wait for the rendering with a bounded lag
             if self.__sync_fct == self.__sync:
-                self.__sync_fct = lambda: None
-                print('Warning: Synchronization is not available for Viewer in batch mode '
-                      '(automatically turned "sync" parameter to False)')
-            self.__socket.bind(('localhost', batch_key))
+                self.__sync_fct = self.__batch_sync
+                self.__sync_arr[1] = 2
+            # Disable images capture for batch mode
+            if len(self.__capture_sm) > 0:
+                for capture_sm in self.__capture_sm:
+                    capture_sm.close()
+                    capture_sm.unlink()
+                self.__capture_sm, self.__capture_arr = [], []
+                print('Warning: Images capture is not available for Viewer in batch mode')
+            self.__batch_key = batch_key
+            return batch_key[0]
         return self.__socket.getsockname()[1]
 
     def connect(self) -> None:
@@ -66,34 +108,171 @@ class Factory:
         Connect to the remote process and communicate each shared memory information.
         """
 
-        # Connect to the remote socket
-        self.__socket.listen()
-        self.__remote, _ = self.__socket.accept()
+        # Connect to the remote socket (in batch mode, connect to the batch endpoint and send the simulation index)
+        if self.__batch_key is None:
+            self.__socket.listen()
+            self.__remote, _ = self.__socket.accept()
+        else:
+            self.__socket.connect(('localhost', self.__batch_key[0]))
+            self.__remote = self.__socket
+            self.__remote.send(self.__batch_key[1].to_bytes(length=2, byteorder='big'))
 
         # Send information about the sync shared array
         sm_name = self.__sync_sm.name.encode(encoding='utf-8')
         self.__remote.send(len(sm_name).to_bytes(length=2, byteorder='big'))
         self.__remote.send(sm_name)
 
-        # Send the number of visual objects, then information about each visual object shared arrays
+        # Send information about the capture shared arrays (empty name if not defined)
+        sm_name = self.__capture_sm[0].name.encode(encoding='utf-8') if len(self.__capture_sm) > 0 else b''
+        self.__remote.send(len(sm_name).to_bytes(length=2, byteorder='big'))
+        if len(sm_name) > 0:
+            self.__remote.send(sm_name)
+            for size in self.__capture_arr[1].shape:
+                self.__remote.send(size.to_bytes(length=2, byteorder='big'))
+
+        # Send the number of visual objects, then information about each visual object shared arrays (an empty object
+        # type for the removed visual objects)
         self.__remote.send(len(self.memories).to_bytes(length=2, byteorder='big'))
         for memory in self.memories:
-            memory.connect(remote=self.__remote)
+            if memory is None:
+                self.__remote.send((0).to_bytes(length=2, byteorder='big'))
+            else:
+                memory.connect(remote=self.__remote)
+        self.__nb_shared = len(self.memories)
 
         # Wait for the remote viewer to create all visual objects
         self.__remote.recv(4)
 
-    def update(self) -> None:
+    def update(self, time: Optional[float] = None) -> None:
         """
         Trigger a render call in the remote process.
+
+        :param time: Simulation time of the current step.
         """
 
-        # Increment the shared step counter to trigger the remote render
-        self.__sync_arr[2] += 1
+        # Share the visual objects added or removed since the previous step, then free the removed visual objects
+        # once the remote process applied the structural changes
+        self.__share_structure()
+        self.__free_removed()
 
-        # If defined, call the synchronization function
+        # Share the simulation time and the recording flag before the step counter is incremented
+        self.__time_arr[0] = nan if time is None else time
+        self.__record_step(time=time)
+
+        # Increment the shared step counter to trigger the remote render, then if defined, call the synchronization
+        # function
+        self.__sync_arr[2] += 1
         self.__sync_fct()
 
+    def free(self, object_id: int) -> None:
+        """
+        Free the shared memories of a removed visual object. If the remote viewer is connected, the shared memories are
+        freed once the remote process removed the visual object (checked without waiting at each update call).
+
+        :param object_id: ID of the visual object.
+        """
+
+        # The visual objects that were not shared yet are directly freed
+        if self.__remote is None or object_id >= self.__nb_shared:
+            self.memories[object_id].close()
+            self.memories[object_id] = None
+        elif object_id not in self.__removed:
+            self.__removed.append(object_id)
+
+    def __share_structure(self) -> None:
+        """
+        Send the visual objects added or removed since the previous step to the remote process, then increment the
+        shared structure counter.
+        """
+
+        if self.__remote is None or (len(self.memories) == self.__nb_shared and len(self.__removed) == 0):
+            return
+
+        # Send the IDs of the removed visual objects
+        self.__remote.send(len(self.__removed).to_bytes(length=2, byteorder='big'))
+        for object_id in self.__removed:
+            self.__remote.send(object_id.to_bytes(length=2, byteorder='big'))
+
+        # Send the number of added visual objects, then information about each visual object shared arrays (the
+        # visual objects added then removed between two steps are only sent as removed objects)
+        self.__remote.send((len(self.memories) - self.__nb_shared).to_bytes(length=2, byteorder='big'))
+        for memory in self.memories[self.__nb_shared:]:
+            if memory is None:
+                self.__remote.send((0).to_bytes(length=2, byteorder='big'))
+            else:
+                memory.connect(remote=self.__remote)
+        self.__nb_shared = len(self.memories)
+
+        # The removed visual objects are freed once the remote process applied this structural change
+        self.__sync_arr[7] += 1
+        self.__freed.extend((int(self.__sync_arr[7]), object_id) for object_id in self.__removed)
+        self.__removed.clear()
+
+    def __free_removed(self) -> None:
+        """
+        Free the shared memories of the removed visual objects once the remote process applied the structural changes
+        (the remote process writes the number of applied changes in the shared synchronization array).
+        """
+
+        while len(self.__freed) > 0 and self.__freed[0][0] <= self.__sync_arr[8]:
+            object_id = self.__freed.pop(0)[1]
+            self.memories[object_id].close()
+            self.memories[object_id] = None
+
+    def capture(self) -> Tuple[ndarray, ndarray]:
+        """
+        Trigger a render call in the remote process and wait for the render window to be read back in the shared
+        image buffers.
+
+        :return: RGB image with shape (height, width, 3) and depth buffer with shape (height, width).
+        """
+
+        if len(self.__capture_arr) == 0:
+            raise ValueError("The image capture was not enabled for this viewer.")
+
+        # Turn the 'do_capture' shared flag on, then increment the shared step counter to trigger the remote render
+        self.__sync_arr[3] = 1
+        self.__record_step(time=None)
+        self.__sync_arr[2] += 1
+
+        # Wait for the remote process to be done, then turn the 'do_capture' shared flag off
+        self.__remote.recv(4)
+        self.__sync_arr[3] = 0
+
+        # The remote process writes the images with the VTK convention (from the bottom-left corner)
+        return self.__capture_arr[0][::-1], self.__capture_arr[1][::-1]
+
+    def set_recording(self, stride: int = 1, period: Optional[float] = None) -> None:
+        """
+        Define the steps recorded in the remote history.
+
+        :param stride: Number of simulation steps between two recorded steps.
+        :param period: Simulation time between two recorded steps (replaces the stride for the steps rendered with a
+                       simulation time).
+        """
+
+        self.__record_stride = max(1, stride)
+        self.__record_period = period
+
+    def __record_step(self, time: Optional[float]) -> None:
+        """
+        Turn the 'do_record' shared flag on if the next step must be recorded. The decision only depends on the step
+        counter and on the simulation time so that the recorded steps do not depend on the rendering pace.
+
+        :param time: Simulation time of the next step.
+        """
+
+        # Record every period of simulation time
+        if self.__record_period is not None and time is not None:
+            bucket = floor(time / self.__record_period + 1e-6)
+            record = bucket != self.__record_bucket
+            self.__record_bucket = bucket
+
+        # Record every stride steps
+        else:
+            record = (self.__sync_arr[2] + 1) % self.__record_stride == 0
+        self.__sync_arr[4] = int(record)
+
     def __sync(self):
         """
         Synchronization with the remote process.
@@ -108,6 +287,17 @@ class Factory:
         # Turn the 'do_synchronize' shared flag off
         self.__sync_arr[1] = 0
 
+    def __batch_sync(self):
+        """
+        Synchronization with the remote batch process.
+        """
+
+        # Wait for the remote process to render the previous steps while the simulation is visible in the batch (the
+        # 'do_synchronize' shared flag is always on)
+        while (self.__sync_arr[6] == 1 and self.__sync_arr[0] == 0 and
+               self.__sync_arr[2] - self.__sync_arr[5] > self.__batch_lag):
+            sleep(1e-4)
+
     def close(self) -> None:
         """
         Close the communication with the visualization process.
@@ -116,17 +306,25 @@ class Factory:
         # Turn the 'do_exit' shared flag on
         self.__sync_arr[0] = 1
 
-        # Wait for the visualization process to close connections with the shared memories
-        self.__remote.recv(4)
+        # Wait for the visualization process to close connections with the shared memories (if it was launched)
+        if self.__remote is not None:
+            self.__remote.recv(4)
 
         # Close the connection with the shared memories (synchronization array and each visual object array)
         self.__sync_sm.close()
         self.__sync_sm.unlink()
+        self.__time_sm.close()
+        self.__time_sm.unlink()
+        for capture_sm in self.__capture_sm:
+            capture_sm.close()
+            capture_sm.unlink()
         for memory in self.memories:
-            memory.close()
+            if memory is not None:
+                memory.close()
 
         # Close local and remote sockets
-        self.__remote.send(b'done')
+        if self.__remote is not None:
+            self.__remote.send(b'done')
         self.__socket.close()
 
 
@@ -192,10 +390,25 @@ class Objects:
         :param object_type: Object type (mesh, points...).
         """
 
+        if self.__types[object_id] == '':
+            raise ValueError(f"The object with ID={object_id} was removed.")
         if object_type != self.__types[object_id]:
             raise ValueError(f"The object with ID={object_id} is type '{self.__types[object_id]}'."
                              f"Call update_{self.__types[object_id]}() instead of update_{object_type}().")
 
+    def remove(self, object_id: int) -> None:
+        """
+        Remove an existing visual object from the viewer and free its shared memories. The IDs of the other visual
+        objects remain valid.
+
+        :param object_id: ID of the object as returned when created.
+        """
+
+        if self.__types[object_id] == '':
+            raise ValueError(f"The object with ID={object_id} was already removed.")
+        self.__types[object_id] = ''
+        self.__factory.free(object_id=object_id)
+
     def add_mesh(self,
                  positions: ndarray,
                  cells: List[int],
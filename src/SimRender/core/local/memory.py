@@ -1,7 +1,140 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Tuple, Optional, Iterable, Any
 from socket import socket
+from threading import Lock
+from time import sleep
+from hashlib import blake2b
 from multiprocessing.shared_memory import SharedMemory
-from numpy import array, ndarray
+from numpy import array, ndarray, isnan
+
+
+# Data fields that are never updated: they are stored once in shared memories named after their content, so that the
+# visual objects with the same topology (in a simulation or in a batch of simulations) share the same buffers
+CONSTANT_FIELDS = {'cells', 'texture_coords'}
+
+# Prefix of the shared memories named after their content
+CONSTANT_PREFIX = 'srd_'
+
+# Content addressed shared memories of the process with format {name: [value_sm, dirty_sm, is_owner, nb_references]}
+_constants: Dict[str, List[Any]] = {}
+_constants_lock = Lock()
+
+# Names of the private shared memories used instead of the content addressed ones with format {content_name: name}
+_aliases: Dict[str, str] = {}
+
+
+def _create_constant(value: ndarray, name: Optional[str] = None) -> Tuple[SharedMemory, SharedMemory]:
+    """
+    Create the shared memories of a constant data field. The dirty flag is created once the value is written, so that
+    its existence tells the other simulation processes that the value is ready.
+
+    :param value: Value of the constant data field.
+    :param name: Name of the shared memory (random name by default).
+    """
+
+    value_sm = SharedMemory(create=True, size=value.nbytes, name=name)
+    ndarray(shape=value.shape, dtype=value.dtype, buffer=value_sm.buf)[...] = value[...]
+    try:
+        dirty_sm = SharedMemory(create=True, size=1, name=f'{value_sm.name}_dirty')
+    except FileExistsError:
+        # Dirty flag left by a process that did not release it
+        dirty_sm = SharedMemory(create=False, name=f'{value_sm.name}_dirty')
+    dirty_sm.buf[0] = 0
+    return value_sm, dirty_sm
+
+
+def _attach_constant(value: ndarray, name: str) -> Optional[Tuple[SharedMemory, SharedMemory]]:
+    """
+    Attach to the shared memories of a constant data field created by another simulation process.
+
+    :param value: Value of the constant data field.
+    :param name: Name of the shared memory.
+    :return: The shared memories, or None if they are not ready in time or if their content differs.
+    """
+
+    # Wait for the creating process to write the value (the dirty flag is created last)
+    dirty_sm = None
+    for _ in range(1000):
+        try:
+            dirty_sm = SharedMemory(create=False, name=f'{name}_dirty')
+            break
+        except FileNotFoundError:
+            sleep(1e-3)
+    if dirty_sm is None:
+        return None
+
+    # Check the content in the unlikely case of a hash collision
+    try:
+        value_sm = SharedMemory(create=False, name=name)
+    except FileNotFoundError:
+        dirty_sm.close()
+        return None
+    if value_sm.size < value.nbytes or bytes(value_sm.buf[:value.nbytes]) != value.tobytes():
+        value_sm.close()
+        dirty_sm.close()
+        return None
+    return value_sm, dirty_sm
+
+
+def share_constant(value: ndarray) -> Tuple[SharedMemory, SharedMemory]:
+    """
+    Get the shared memories (value and dirty flag) of a constant data field, named after its content.
+    The shared memories are created by the first visual object (of any simulation process) with this content.
+
+    :param value: Value of the constant data field.
+    """
+
+    digest = blake2b(value.dtype.str.encode() + array(value.shape).tobytes() + value.tobytes(), digest_size=8)
+    name = f'{CONSTANT_PREFIX}{digest.hexdigest()}'
+    with _constants_lock:
+        name = _aliases.get(name, name)
+
+        # The shared memories already exist in this process
+        if name in _constants:
+            _constants[name][3] += 1
+            return _constants[name][0], _constants[name][1]
+
+        # Create the shared memories, or attach to the ones created by another simulation process (private shared
+        # memories are created if they cannot be shared)
+        try:
+            value_sm, dirty_sm = _create_constant(value=value, name=name)
+            is_owner = True
+        except FileExistsError:
+            shared = _attach_constant(value=value, name=name)
+            is_owner = shared is None
+            value_sm, dirty_sm = _create_constant(value=value) if shared is None else shared
+            if value_sm.name != name:
+                _aliases[name], name = value_sm.name, value_sm.name
+
+        _constants[name] = [value_sm, dirty_sm, is_owner, 1]
+        return value_sm, dirty_sm
+
+
+def release_constant(name: str) -> bool:
+    """
+    Release a reference to the shared memories of a constant data field, close them with the last reference.
+
+    :param name: Name of the shared memory.
+    :return: True if the shared memories were content addressed.
+    """
+
+    with _constants_lock:
+        if name not in _constants:
+            return False
+        _constants[name][3] -= 1
+        if _constants[name][3] == 0:
+            value_sm, dirty_sm, is_owner, _ = _constants.pop(name)
+            for content_name in [key for key, alias in _aliases.items() if alias == name]:
+                del _aliases[content_name]
+            value_sm.close()
+            dirty_sm.close()
+            # The shared memories may already be unlinked by the resource tracker of another simulation process
+            if is_owner:
+                for sm in (value_sm, dirty_sm):
+                    try:
+                        sm.unlink()
+                    except FileNotFoundError:
+                        pass
+        return True
 
 
 class Memory:
@@ -33,6 +166,14 @@ class Memory:
             # Dirty flag template
             dirty = array(0, dtype=bool)
 
+            # Constant data fields share the buffers of the visual objects with the same content
+            if key in CONSTANT_FIELDS and value.size > 0 and not (value.dtype.kind == 'f' and isnan(value).all()):
+                value_sm, dirty_sm = share_constant(value=value)
+                self.__buffers[key] = [value_sm, dirty_sm]
+                self.__data[key] = ndarray(shape=value.shape, dtype=value.dtype, buffer=value_sm.buf)
+                self.__dirty[key] = ndarray(shape=dirty.shape, dtype=dirty.dtype, buffer=dirty_sm.buf)
+                continue
+
             # Create the shared memories buffers for the data field and the associated dirty flag
             value_sm = SharedMemory(create=True, size=value.nbytes)
             dirty_sm = SharedMemory(create=True, size=dirty.nbytes, name=f'{value_sm.name}_dirty')
@@ -44,6 +185,13 @@ class Memory:
             self.__dirty[key] = ndarray(shape=dirty.shape, dtype=dirty.dtype, buffer=dirty_sm.buf)
             self.__dirty[key][...] = dirty[...]
 
+        # Dirty flags turned off before each update (the flags of the constant data fields are shared and always False)
+        self.__reset = [flag for key, flag in self.__dirty.items() if key not in CONSTANT_FIELDS]
+
+    @property
+    def object_type(self) -> str:
+        return self.__object_type
+
     def connect(self, remote: socket) -> None:
         """
         Send each shared memory information to the visualization process.
@@ -80,20 +228,29 @@ class Memory:
             remote.send(len(dtype).to_bytes(length=2, byteorder='big'))
             remote.send(dtype)
 
-    def update(self, data: Dict[str, Any]) -> None:
+    def update(self, data: Dict[str, Any], changed: Iterable[str] = ()) -> None:
         """
         Update the shared arrays values.
 
         :param data: New object data (positions, color...).
+        :param changed: Data fields known to be modified (such as SOFA Data fields with a new modification counter):
+                        they are directly copied in the shared arrays without being compared.
         """
 
         # Turn all the dirty flags to False
-        for key in self.__dirty.keys():
-            self.__dirty[key][...] = False
+        for flag in self.__reset:
+            flag[...] = False
 
-        # Update each data field
-        for key, value in data.items():
+        # Single copy of the modified data fields in the shared arrays
+        for key in changed:
+            value = data.get(key)
             if value is not None:
+                self.__data[key][...] = value
+                self.__dirty[key][...] = True
+
+        # Update each other data field if its value changed
+        for key, value in data.items():
+            if value is not None and key not in changed:
 
                 # Convert data to array
                 value = value if isinstance(value, ndarray) else array(value)
@@ -111,8 +268,10 @@ class Memory:
         Close every shared memories.
         """
 
-        # Close each data/dirty shared memory pair
+        # Close each data/dirty shared memory pair (the constant ones are closed with their last reference)
         for buffers in self.__buffers.values():
+            if release_constant(name=buffers[0].name):
+                continue
             buffers[0].close()
             buffers[0].unlink()
             buffers[1].close()
@@ -1,13 +1,56 @@
+from typing import Optional, List
+from subprocess import run
+from sys import executable
+from json import dumps
+
 from SimRender.core.local.viewer import Viewer
 from SimRender.core.remote import player
 
 
 class Player(Viewer):
 
-    def __init__(self):
+    def __init__(self,
+                 history_dir: Optional[str] = None,
+                 ram_budget: int = 512,
+                 record_stride: int = 1,
+                 record_period: Optional[float] = None,
+                 record_objects: Optional[List[int]] = None,
+                 record_fields: Optional[List[str]] = None):
         """
         This class manages a single remote viewer to render visual objects.
+
+        :param history_dir: Directory of the history files (a temporary directory is used by default). If defined, the
+                            history is kept as a recording that can be replayed with Player.replay().
+        :param ram_budget: Maximum size in MB of the history loaded in RAM, the rest of the history being stored on
+                           disk.
+        :param record_stride: Number of simulation steps between two recorded steps.
+        :param record_period: Simulation time between two recorded steps (replaces the stride if the simulation time is
+                              given to render calls).
+        :param record_objects: Indices of the visual objects whose changes are recorded (all by default).
+        :param record_fields: Data fields whose changes are recorded (all by default). The other data fields only keep
+                              their initial value in the history.
         """
 
         super().__init__(sync=True)
         self._remote_script = player.__file__
+        self._remote_options.update(history_dir=history_dir, ram_budget=ram_budget,
+                                    record_objects=record_objects, record_fields=record_fields)
+
+        # The recorded steps are defined by the simulation process so that they do not depend on the rendering pace
+        self._set_recording(stride=record_stride, period=record_period)
+
+    @staticmethod
+    def replay(record_dir: str, speed: float = 1., interpolate: bool = False) -> None:
+        """
+        Replay a recorded session in a rendering window without running the simulation again.
+        The recorded steps are played at the pace of the simulation time (given in render calls), otherwise at the pace
+        of the recording.
+
+        :param record_dir: Directory of the recording (the 'history_dir' of the recorded Player).
+        :param speed: Playback speed factor, relative to the simulation time.
+        :param interpolate: If True, the positions are linearly interpolated between the recorded steps so that sparse
+                            recordings are smoothly played.
+        """
+
+        run([executable, player.__file__, '0', dumps({'replay': record_dir, 'speed': speed,
+                                                      'interpolate': interpolate})])
@@ -1,7 +1,9 @@
-from typing import Optional
+from typing import Optional, Tuple
 from threading import Thread
 from subprocess import run
 from sys import executable
+from json import dumps
+from numpy import ndarray
 
 from SimRender.core.local.factory import Factory, Objects
 from SimRender.core.remote import viewer
@@ -9,20 +11,40 @@ from SimRender.core.remote import viewer
 
 class Viewer:
 
-    def __init__(self, sync: bool = False):
+    def __init__(self,
+                 sync: bool = False,
+                 offscreen: bool = False,
+                 output: Optional[str] = None,
+                 resolution: Tuple[int, int] = (1280, 720),
+                 stride: int = 1,
+                 capture_images: bool = False,
+                 batch_lag: int = 0):
         """
         This class manages a single remote viewer to render visual objects.
 
         :param sync: If True, the rendering step will block the python code execution. Otherwise, the viewer will only
                      render the current status of the simulation. Use it if you want to make sure that all your
                      simulation steps are rendered.
+        :param offscreen: If True, the rendering is performed without any window (headless mode for clusters or CI).
+        :param output: Path to a directory (PNG sequence) or to a video file (mp4, avi...) to write the rendered frames.
+        :param resolution: Size of the rendered frames in headless mode or with images capture.
+        :param stride: Number of simulation steps between two written frames.
+        :param capture_images: If True, the rendered images can be returned to the simulation with capture(). The
+                               rendering window then keeps the defined resolution.
+        :param batch_lag: In batch mode with sync, maximum number of steps between the simulation and the rendering.
+                          Only the simulations visible in the batch viewer wait for the rendering.
         """
 
         # Create a Factory to manage visual objects and remote communication
-        self.__factory = Factory(sync=sync)
+        self.__factory = Factory(sync=sync, capture_size=resolution if capture_images else None, batch_lag=batch_lag)
         self.__subprocess: Optional[Thread] = None
         self._remote_script = viewer.__file__
 
+        # Options of the remote viewer (headless mode and frames writing)
+        self._remote_options = {'offscreen': offscreen, 'output': output, 'stride': stride}
+        if offscreen or capture_images:
+            self._remote_options['size'] = list(resolution)
+
     @property
     def is_open(self) -> bool:
         return self.__factory.is_open
@@ -38,13 +60,15 @@ class Viewer:
     def len(self):
         return self.__factory.memories
 
-    def launch(self, batch_key: Optional[int] = None) -> None:
+    def launch(self, batch_key: Optional[Tuple[int, int]] = None) -> None:
         """
         Launch the rendering window in its own python process.
+
+        :param batch_key: Key given by ViewerBatch.start() to render the simulation in a batch viewer.
         """
 
         def __launch(port: int):
-            run([executable, self._remote_script, str(port)])
+            run([executable, self._remote_script, str(port), dumps(self._remote_options)])
 
         # Init the local factory connection
         socket_port = self.__factory.init(batch_key=batch_key)
@@ -57,13 +81,38 @@ class Viewer:
         # Share data between local and remote factories
         self.__factory.connect()
 
-    def render(self) -> None:
+    def render(self, time: Optional[float] = None) -> None:
         """
         Render the current step of the simulation.
+
+        :param time: Simulation time of the current step, used to replay the recorded steps at their real pace.
         """
 
         # Share the update command between local and remote factories
-        self.__factory.update()
+        self.__factory.update(time=time)
+
+    def _set_recording(self, stride: int = 1, period: Optional[float] = None) -> None:
+        """
+        Define the steps recorded in the remote history (used by the Player).
+
+        :param stride: Number of simulation steps between two recorded steps.
+        :param period: Simulation time between two recorded steps.
+        """
+
+        self.__factory.set_recording(stride=stride, period=period)
+
+    def capture(self) -> Tuple[ndarray, ndarray]:
+        """
+        Render the current step of the simulation and return the rendered images.
+        The returned arrays directly access the shared image buffers: they are overwritten by the next capture call
+        (copy them to keep them).
+
+        :return: RGB image with shape (height, width, 3) and depth buffer (normalized between 0 and 1) with shape
+                 (height, width).
+        """
+
+        # Share the capture command between local and remote factories
+        return self.__factory.capture()
 
     def shutdown(self) -> None:
         """
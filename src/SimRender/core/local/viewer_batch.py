@@ -1,46 +1,73 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from socket import socket, AF_INET, SOCK_STREAM
 from threading import Thread
-from subprocess import run
+from subprocess import Popen
 from sys import executable
+from json import dumps
 from os.path import dirname, join
 
 
 class ViewerBatch:
 
-    def __init__(self):
+    def __init__(self,
+                 grid: bool = False,
+                 link_cameras: bool = False,
+                 fps: float = 30.,
+                 inactive_fps: float = 5.,
+                 ensemble: Optional[str] = None):
         """
         This class manages a single remote viewer to render visual objects from several simulation sources.
+
+        :param grid: If True, the simulations are rendered side by side in a grid of viewports. Otherwise, a single
+                     simulation is rendered at a time (selected in a tab menu).
+        :param link_cameras: If True, the viewports of the grid share the same camera.
+        :param fps: Maximum refresh rate of the active simulation.
+        :param inactive_fps: Maximum refresh rate of the other simulations (in the grid or hidden in the tab menu), so
+                             that large batches remain interactive and switching between the simulations is instant.
+        :param ensemble: If defined, the statistics of the batch (mean positions of the first mesh of the simulations)
+                         are rendered in an additional view, colored by this statistic: 'spread' (standard deviation of
+                         the positions), 'mean', 'std', 'min' or 'max' (of the colormap field).
         """
 
         self.__subprocess: Optional[Thread] = None
+        self.__process: Optional[Popen] = None
+        self.__options = {'grid': grid, 'link_cameras': link_cameras, 'fps': fps, 'inactive_fps': inactive_fps,
+                          'ensemble': ensemble}
 
-    def start(self, nb_view: int) -> List[int]:
+    def start(self, nb_view: int) -> List[Tuple[int, int]]:
         """
         Launch the rendering window in its own python process.
 
         :param nb_view: Number of simulations sources to render.
+        :return: Batch keys to launch the viewers with.
         """
 
-        def __launch(ports: List[int]):
-            run([executable, join(dirname(dirname(__file__)), 'remote', 'viewer_batch.py'),
-                 ' '.join([str(port) for port in ports])])
-
-        available_socket_ports = []
-        for _ in range(nb_view):
-            temp_socket = socket(AF_INET, SOCK_STREAM)
-            temp_socket.bind(('localhost', 0))
-            available_socket_ports.append(temp_socket.getsockname()[1])
-            temp_socket.close()
+        def __launch(port: int):
+            self.__process = Popen([executable, join(dirname(dirname(__file__)), 'remote', 'viewer_batch.py'),
+                                    str(nb_view), str(port), dumps(self.__options)])
+            self.__process.wait()
 
-        self.__subprocess = Thread(target=__launch, args=(available_socket_ports,))
-        self.__subprocess.start()
+        # The remote process creates the single endpoint of the batch, then shares its port through a local socket
+        with socket(AF_INET, SOCK_STREAM) as local:
+            local.bind(('localhost', 0))
+            local.listen()
+            self.__subprocess = Thread(target=__launch, args=(local.getsockname()[1],))
+            self.__subprocess.start()
+            remote, _ = local.accept()
+            batch_port = int.from_bytes(bytes=remote.recv(2), byteorder='big')
+            remote.close()
 
-        return available_socket_ports
+        # Each simulation is identified by its index in the batch
+        return [(batch_port, i) for i in range(nb_view)]
 
-    def stop(self) -> None:
+    def stop(self, close: bool = False) -> None:
         """
-        Close the rendering window.
+        Wait for the rendering window to be closed.
+
+        :param close: If True, the rendering window is closed without waiting for the user (the simulations should be
+                      stopped first).
         """
 
+        if close and self.__process is not None:
+            self.__process.terminate()
         self.__subprocess.join()
@@ -0,0 +1,210 @@
+from typing import Any, Dict, List, Optional
+from threading import Thread, Lock, Event
+from numpy import ndarray, zeros, full, isnan, sqrt, maximum, nanmin, nanmax
+from numpy.linalg import norm
+from vedo import Plotter, Mesh
+
+from SimRender.core.remote.factory import Factory
+from SimRender.core.utils import get_mesh_cells
+
+
+class Ensemble:
+
+    # Statistics of the ensemble that can be rendered with the colormap
+    STATISTICS = ('spread', 'mean', 'std', 'min', 'max')
+
+    def __init__(self,
+                 factories: List[Optional[Factory]],
+                 plotter: Plotter,
+                 object_id: int = 0,
+                 statistic: str = 'spread',
+                 colormap: str = 'jet',
+                 at: Optional[int] = None,
+                 period: float = 0.1):
+        """
+        This class renders the statistics of a batch of perturbed copies of the same model.
+        The shared arrays of the members are read in a background thread, where the running mean and standard
+        deviation of the positions and the mean, standard deviation, min and max of the colormap field are computed
+        over the members. The result is rendered as a mesh with the mean positions, colored by a statistic.
+
+        :param factories: Factories of the batch members (None for the members that are not connected yet).
+        :param plotter: Plotter instance.
+        :param object_id: Index of the mesh object shared by the members.
+        :param statistic: Statistic rendered with the colormap: 'spread' is the per-vertex standard deviation of the
+                          positions, 'mean', 'std', 'min' and 'max' are computed over the colormap field.
+        :param colormap: Colormap of the statistic.
+        :param at: Index of the renderer of the mesh in the Plotter (current renderer by default).
+        :param period: Minimum time between two computations of the statistics.
+        """
+
+        if statistic not in self.STATISTICS:
+            raise ValueError(f'The ensemble statistic must be in {self.STATISTICS}, got {statistic}.')
+
+        self.__factories = factories
+        self.__object_id = object_id
+        self.statistic = statistic
+        self.colormap = colormap
+        self.plt = plotter
+        self.at = at
+        self.__period = period
+
+        # Visual object, created with the first computed statistics
+        self.object: Optional[Mesh] = None
+        self.__visible = True
+        self.__cells: Optional[List[List[int]]] = None
+
+        # Latest values of the members and running sums with format (nb_members, nb_vertices, ...)
+        self.__counts = [-1] * len(factories)
+        self.__ignored = set()
+        self.__members = zeros(len(factories), dtype=bool)
+        self.__positions: Optional[ndarray] = None
+        self.__shift: Optional[ndarray] = None
+        self.__field: Optional[ndarray] = None
+        self.__sums: Dict[str, ndarray] = {}
+
+        # Latest computed statistics, shared with the rendering thread
+        self.__result: Optional[Dict[str, Any]] = None
+        self.__lock = Lock()
+        self.__stop = Event()
+        self.__thread = Thread(target=self.__compute, daemon=True)
+        self.__thread.start()
+
+    def __compute(self) -> None:
+        """
+        Computing thread of the statistics.
+        """
+
+        while not self.__stop.wait(self.__period):
+            if self.__gather():
+                result = self.__statistics()
+                with self.__lock:
+                    self.__result = result
+
+    def __gather(self) -> bool:
+        """
+        Copy the data of the members that advanced since the previous computation and update the running sums.
+
+        :return: True if a member was updated.
+        """
+
+        updated = False
+        for i, factory in enumerate(self.__factories):
+
+            # Check the step counter of the member
+            if factory is None or i in self.__ignored or not factory.is_open or factory.count == self.__counts[i]:
+                continue
+            self.__counts[i] = factory.count
+            shared = factory.get_data(object_id=self.__object_id)
+            if shared is None or shared[0] != 'mesh':
+                continue
+            data = shared[1]
+
+            # The buffers are allocated with the first member
+            if self.__positions is None:
+                nb_members, nb_vertices = len(self.__factories), len(data['positions'])
+                cells = data['cells']
+                self.__cells = cells.tolist() if len(cells.shape) > 1 else get_mesh_cells(flat_cells=cells)
+                self.__positions = zeros((nb_members, nb_vertices, 3))
+                self.__shift = data['positions'].astype(float)
+                self.__field = full((nb_members, nb_vertices), fill_value=float('nan'))
+                self.__sums = {'positions': zeros((nb_vertices, 3)), 'positions_sq': zeros((nb_vertices, 3)),
+                               'field': zeros(nb_vertices), 'field_sq': zeros(nb_vertices)}
+            if data['positions'].shape != self.__positions.shape[1:]:
+                print(f'Warning: the simulation n°{i + 1} does not share the same mesh, it is ignored in the '
+                      f'ensemble.')
+                self.__ignored.add(i)
+                continue
+
+            # Update the running sums with the difference between the new and the previous values of the member (the
+            # positions are shifted by the first received ones to limit the cancellation errors in the variance)
+            positions = data['positions'].astype(float) - self.__shift
+            field = data['colormap_field'].astype(float).reshape(-1)
+            if len(field) != len(positions) or isnan(field).any():
+                field = full(len(positions), fill_value=float('nan'))
+            if self.__members[i]:
+                self.__sums['positions'] -= self.__positions[i]
+                self.__sums['positions_sq'] -= self.__positions[i] ** 2
+                if not isnan(self.__field[i]).any():
+                    self.__sums['field'] -= self.__field[i]
+                    self.__sums['field_sq'] -= self.__field[i] ** 2
+            self.__positions[i], self.__field[i] = positions, field
+            self.__members[i] = True
+            self.__sums['positions'] += positions
+            self.__sums['positions_sq'] += positions ** 2
+            if not isnan(field).any():
+                self.__sums['field'] += field
+                self.__sums['field_sq'] += field ** 2
+            updated = True
+        return updated
+
+    def __statistics(self) -> Dict[str, Any]:
+        """
+        Compute the statistics of the ensemble from the running sums.
+        """
+
+        # Mean and standard deviation of the positions over the members
+        nb_members = self.__members.sum()
+        mean = self.__sums['positions'] / nb_members
+        std = sqrt(maximum(self.__sums['positions_sq'] / nb_members - mean ** 2, 0.))
+        result = {'positions': mean + self.__shift, 'spread': norm(std, axis=1)}
+
+        # Statistics of the colormap field over the members that define it
+        fields = self.__field[self.__members]
+        nb_fields = (~isnan(fields).any(axis=1)).sum()
+        if nb_fields > 0:
+            result['mean'] = self.__sums['field'] / nb_fields
+            result['std'] = sqrt(maximum(self.__sums['field_sq'] / nb_fields - result['mean'] ** 2, 0.))
+            result['min'] = nanmin(fields, axis=0)
+            result['max'] = nanmax(fields, axis=0)
+        return result
+
+    @property
+    def visible(self) -> bool:
+        """
+        Check if the visual object is rendered in the Plotter.
+        """
+
+        return self.__visible
+
+    @visible.setter
+    def visible(self, value: bool) -> None:
+
+        if value != self.__visible and self.object is not None:
+            if value:
+                self.plt.add(self.object, at=self.at)
+            else:
+                self.plt.remove(self.object, at=self.at)
+        self.__visible = value
+
+    def update(self) -> bool:
+        """
+        Update the visual object with the latest computed statistics (rendering thread).
+
+        :return: True if the visual object was updated.
+        """
+
+        with self.__lock:
+            result, self.__result = self.__result, None
+        if result is None:
+            return False
+
+        # The colormap falls back to the spread of the positions if the members do not define a colormap field
+        values = result.get(self.statistic, result['spread'])
+        if self.object is None:
+            self.object = Mesh(inputobj=[result['positions'], self.__cells])
+            self.object.cmap(input_cmap=self.colormap, input_array=values).add_scalarbar(title=self.statistic)
+            if self.__visible:
+                self.plt.add(self.object, at=self.at)
+                self.plt.renderers[self.at or 0].ResetCamera()
+        else:
+            self.object.vertices = result['positions']
+            self.object.cmap(input_cmap=self.colormap, input_array=values)
+        return True
+
+    def close(self) -> None:
+        """
+        Stop the computing thread.
+        """
+
+        self.__stop.set()
+        self.__thread.join()
@@ -1,35 +1,91 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Set, Tuple, Any
 from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR
-from threading import Thread
+from threading import Thread, Lock
 from multiprocessing.shared_memory import SharedMemory
-from time import sleep
-from numpy import array, ndarray, isnan
+from time import sleep, time
+from os.path import join, exists
+from numpy import array, ndarray, isnan, uint8, float32, int64, arange, full, column_stack, save, load as np_load
 from vedo import Plotter, Mesh, Points, Arrows, Lines, Text2D
+from vedo.utils import buildPolyData
 from matplotlib.colors import Normalize
 from matplotlib.pyplot import get_cmap
+from vtkmodules.vtkCommonCore import vtkUnsignedCharArray, vtkFloatArray
+from vtkmodules.vtkCommonDataModel import vtkCellArray
+from vtkmodules.util.numpy_support import numpy_to_vtk, numpy_to_vtkIdTypeArray
 
-from SimRender.core.remote.memory import Memory
-from SimRender.core.utils import fix_memory_leak, get_mesh_cells
+from SimRender.core.remote.memory import Memory, Record
+from SimRender.core.remote.history import Storage
+from SimRender.core.remote.prefetch import FramePrefetcher
+from SimRender.core.utils import fix_memory_leak
+
+
+# Data fields defining the colormap of a visual object
+CMAP_FIELDS = {'colormap', 'colormap_field', 'colormap_range'}
+
+# Data fields whose changes require to apply the colormap again (applying a color disables the colormap)
+RECOLOR_FIELDS = CMAP_FIELDS | {'color'}
+
+# Data fields (and prepared arrays) interpolated between two recorded frames
+POSITION_FIELDS = {'positions', 'vectors', 'start_positions', 'end_positions', 'vertices'}
+
+# VTK cells of the content addressed topologies, built once for all the visual objects with format {key: vtkCellArray}
+_cells_cache: Dict[str, vtkCellArray] = {}
+_cells_lock = Lock()
+
+
+def get_cell_array(cells: ndarray, key: Optional[str] = None) -> vtkCellArray:
+    """
+    Get the VTK cells of a mesh from its faces array (fixed size faces or flat faces with format
+    [n0, id0 ... idn, n1, ...]).
+
+    :param cells: Faces of the mesh.
+    :param key: Content key of the faces, the VTK cells are then built once and shared by all the meshes.
+    """
+
+    with _cells_lock:
+        if key is not None and key in _cells_cache:
+            return _cells_cache[key]
+
+    # Both formats are converted to the VTK legacy format without any python loop
+    legacy = cells if len(cells.shape) == 1 else column_stack([full(len(cells), cells.shape[1]), cells])
+    cell_array = vtkCellArray()
+    cell_array.ImportLegacyFormat(numpy_to_vtkIdTypeArray(legacy.astype(int64).reshape(-1), deep=True))
+    if key is not None:
+        with _cells_lock:
+            _cells_cache[key] = cell_array
+    return cell_array
 
 
 class Factory:
 
-    def __init__(self, socket_port: int, plotter: Plotter, store_data: bool = False):
+    def __init__(self,
+                 socket_port: Optional[int],
+                 plotter: Plotter,
+                 storage: Optional[Storage] = None,
+                 record_objects: Optional[List[int]] = None,
+                 record_fields: Optional[List[str]] = None,
+                 at: Optional[int] = None,
+                 remote: Optional[socket] = None):
         """
         This class is used to manage the communication with the simulation process.
         It loads the visualization data from shared arrays.
 
         :param socket_port: Port number of the simulation socket.
         :param plotter: Plotter instance.
+        :param storage: If defined, the history of the visual objects is recorded in this storage.
+        :param record_objects: Indices of the visual objects whose changes are recorded (all by default).
+        :param record_fields: Data fields whose changes are recorded (all by default).
+        :param at: Index of the renderer of the visual objects in the Plotter (current renderer by default).
+        :param remote: Socket already connected to the simulation process (batch mode), replaces the socket port.
         """
 
         # CPython issue: https://github.com/python/cpython/issues/82300
         fix_memory_leak()
 
         # Connect to the simulation process (possibly wait for the server to bind to the defined address)
-        self.__socket = socket(AF_INET, SOCK_STREAM)
+        self.__socket = socket(AF_INET, SOCK_STREAM) if remote is None else remote
         self.__socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
-        connected = False
+        connected = remote is not None
         while not connected:
             try:
                 self.__socket.connect(('localhost', socket_port))
@@ -37,40 +93,101 @@ class Factory:
             except ConnectionRefusedError:
                 pass
 
-        # Load the shared numpy array for synchronization with format [do_exit, do_synchronize, step_counter]
-        sync_array = array([0, 0, 0], dtype=int)
+        # Load the shared numpy array for synchronization with format [do_exit, do_synchronize, step_counter,
+        # do_capture, do_record, rendered_step, is_visible, structure_counter, applied_structures]
+        sync_array = array([0, 0, 0, 0, 1, 0, 1, 0, 0], dtype=int)
         sm_name = self.__socket.recv(int.from_bytes(bytes=self.__socket.recv(2), byteorder='big')).decode('utf-8')
         self.__sync_sm = SharedMemory(create=False, name=sm_name)
         self.__sync_arr = ndarray(shape=sync_array.shape, dtype=sync_array.dtype, buffer=self.__sync_sm.buf)
 
-        # Create the visual objects and the associated memories containers
-        self.__objects: List[Object] = []
-        self.__memories: List[Memory] = []
+        # Load the shared numpy array for the simulation time of the current step
+        self.__time_sm = SharedMemory(create=False, name=f'{sm_name}_time')
+        self.__time_arr = ndarray(shape=(1,), dtype=float, buffer=self.__time_sm.buf)
+
+        # A batch member is detached from the viewer once it stopped, so that its process exits before the window
+        self.__detached = False
+
+        # Load the shared image buffers for capture if defined, wrapped in VTK arrays so that the render window is
+        # directly read back in the shared memories
+        self.__capture_sm: List[SharedMemory] = []
+        self.__capture_vtk: List[vtkUnsignedCharArray | vtkFloatArray] = []
+        self.__capture_size = (0, 0)
+        sm_name = self.__socket.recv(int.from_bytes(bytes=self.__socket.recv(2), byteorder='big')).decode('utf-8')
+        if len(sm_name) > 0:
+            height, width = [int.from_bytes(bytes=self.__socket.recv(2), byteorder='big') for _ in range(2)]
+            self.__capture_size = (width, height)
+            self.__capture_sm = [SharedMemory(create=False, name=sm_name),
+                                 SharedMemory(create=False, name=f'{sm_name}_depth')]
+            rgb = ndarray(shape=(height * width, 3), dtype=uint8, buffer=self.__capture_sm[0].buf)
+            depth = ndarray(shape=(height * width,), dtype=float32, buffer=self.__capture_sm[1].buf)
+            self.__capture_vtk = [numpy_to_vtk(rgb), numpy_to_vtk(depth)]
+
+        # Create the visual objects and the associated memories containers (None for the removed visual objects)
+        self.__objects: List[Optional[Object]] = []
+        self.__memories: List[Optional[Memory]] = []
 
         # Receive the number of visual objects, then information about each visual object shared array
+        self.plt = plotter
+        self.__at = at
         nb_object = int.from_bytes(bytes=self.__socket.recv(2), byteorder='big')
-        for _ in range(nb_object):
+        for idx in range(nb_object):
+            tracked = [] if record_objects is not None and idx not in record_objects else record_fields
+            self.__receive_object(storage=storage, tracked=tracked)
+
+        # The visual objects created with the viewer are recorded, the ones added at runtime are not (a removed visual
+        # object keeps its last state in the history)
+        self.__recorded: List[Tuple[Object, Memory]] = [(o, m) for o, m in zip(self.__objects, self.__memories)
+                                                        if o is not None]
+        self.__nb_structures = 0
+
+        # Record the initial frame with its time stamps with format [(simulation_time, wall_time)]
+        self.__storage = storage
+        self.__times: List[Tuple[float, float]] = []
+        if storage is not None:
+            for _, memory in self.__recorded:
+                memory.store()
+            self.__times.append((self.__time_arr[0], time()))
+
+        # Prepare the recorded frames around the cursor in a background thread
+        self.__prefetcher = FramePrefetcher(prepare=lambda idx: [o.prepare(idx=idx) for o, _ in self.__recorded])
+
+    def __receive_object(self, storage: Optional[Storage] = None, tracked: Optional[List[str]] = None) -> None:
+        """
+        Receive the information about the shared arrays of a visual object, then create the visual object.
 
-            # Receive the object type
-            object_type = self.__socket.recv(int.from_bytes(bytes=self.__socket.recv(2),
-                                                            byteorder='big')).decode(encoding='utf-8')
+        :param storage: If defined, the history of the visual object is recorded in this storage.
+        :param tracked: Data fields whose changes are recorded (all by default).
+        """
 
-            # Receive data shared arrays in memory
-            memory = Memory(remote=self.__socket, store_data=store_data)
+        # Receive the object type (empty for a removed visual object)
+        object_type = self.__socket.recv(int.from_bytes(bytes=self.__socket.recv(2),
+                                                        byteorder='big')).decode(encoding='utf-8')
+        if object_type == '':
+            self.__memories.append(None)
+            self.__objects.append(None)
+            return
 
-            # Create the visual object
-            self.__objects.append(Object(object_type=object_type, memory=memory, plotter=plotter))
+        # Receive data shared arrays in memory
+        memory = Memory(remote=self.__socket, storage=storage, tracked=tracked)
+        self.__memories.append(memory)
 
-        # Plotter instance
-        self.plt = plotter
-        self.active = True
+        # Create the visual object
+        self.__objects.append(Object(object_type=object_type, memory=memory, plotter=self.plt, at=self.__at))
 
     @property
     def vedo_objects(self) -> List[Points]:
         """
         Get the list of visual objects in the factory.
         """
-        return [o.object for o in self.__objects]
+        return [o.object for o in self.__objects if o is not None]
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Check that the do_exit flag is not turned on by the simulation process.
+        """
+
+        return self.__sync_arr[0] == 0
 
     @property
     def count(self) -> int:
@@ -80,6 +197,34 @@ class Factory:
 
         return self.__sync_arr[2]
 
+    @property
+    def nb_frames(self) -> int:
+        """
+        Get the number of recorded frames.
+        """
+
+        return self.__recorded[0][1].nb_frames if len(self.__recorded) > 0 else 0
+
+    @property
+    def times(self) -> ndarray:
+        """
+        Get the time stamps of the recorded frames with format [[simulation_time, wall_time]].
+        """
+
+        return array(self.__times, dtype=float).reshape(-1, 2)
+
+    def get_data(self, object_id: int) -> Optional[Tuple[str, Dict[str, ndarray]]]:
+        """
+        Get the type and the shared arrays of the data fields of a visual object (the arrays are written by the
+        simulation process, they must be copied to be kept).
+
+        :param object_id: Index of the visual object.
+        """
+
+        if not 0 <= object_id < len(self.__objects) or self.__objects[object_id] is None:
+            return None
+        return self.__objects[object_id].object_type, self.__memories[object_id].get()[0]
+
     def listen(self) -> None:
         """
         Launch the listening thread of the factory.
@@ -102,28 +247,159 @@ class Factory:
             # Do not access the shared array value to often
             sleep(0.1)
 
-        # Do not exit while the rendering window is not closed
-        while not self.plt._must_close_now:
+        # Do not exit while the rendering window is not closed (unless the simulation process was detached)
+        while not self.plt._must_close_now and not self.__detached:
             pass
-        self.close()
+        if not self.__detached:
+            self.close()
+
+    @property
+    def detached(self) -> bool:
+        """
+        Check if the simulation process was released before the window is closed.
+        """
+
+        return self.__detached
+
+    def detach(self) -> None:
+        """
+        Release the simulation process once it stopped (the do_exit flag is turned on), without waiting for the
+        window to be closed. The visual objects keep their last state: the shared memories freed by the simulation
+        process remain mapped in this process until it exits.
+        """
+
+        self.__detached = True
+        self.__socket.send(b'done')
+
+    @property
+    def active(self) -> bool:
+        """
+        Check if the visual objects are visible in the viewer.
+        """
+
+        return self.__sync_arr[6] == 1
+
+    @active.setter
+    def active(self, value: bool) -> None:
+
+        # The synchronized simulations of a batch only wait for the rendering of the visible objects
+        self.__sync_arr[6] = int(value)
+
+        # The visual objects remain in the Plotter, only their visibility is toggled
+        for o in self.vedo_objects:
+            if value:
+                o.on()
+            else:
+                o.off()
+
+    @property
+    def synchronized(self) -> bool:
+        """
+        Check if the simulation waits for the rendering of each step.
+        """
+
+        return self.__sync_arr[1] > 0
 
     def update(self) -> None:
         """
         Update the visual objects.
         """
 
+        step = self.__sync_arr[2]
+
+        # Apply the structural changes of the scene (each change is sent once by the simulation process, with an
+        # incremented structure counter), then share the number of applied changes so that the simulation process
+        # frees the removed visual objects without waiting
+        while self.__nb_structures < self.__sync_arr[7]:
+            self.__update_structure()
+        self.__sync_arr[8] = self.__nb_structures
+
         # Update each visual object
         for o in self.__objects:
-            o.update()
-
-        # Notify the simulation process if the do_synchronize flag is turned on
+            if o is not None:
+                o.update()
+
+        # Record the changes before the simulation process is notified (the recorded steps are defined by the
+        # simulation process with the do_record flag)
+        if self.__storage is not None:
+            record = self.__sync_arr[4] == 1
+            for _, memory in self.__recorded:
+                memory.store(record=record)
+            if record:
+                self.__times.append((self.__time_arr[0], time()))
+
+        # Notify the simulation process if the do_synchronize flag is turned on (in batch mode, the simulation process
+        # reads the rendered step)
+        self.__sync_arr[5] = step
         if self.__sync_arr[1] == 1:
             self.__socket.send(b'done')
 
-    def set_frame(self, idx: int) -> None:
+    def __update_structure(self) -> None:
+        """
+        Remove and create the visual objects that were removed or added in the simulation process.
+        """
 
-        for o in self.__objects:
-            o.set_frame(idx=idx)
+        # Remove the visual objects from the Plotter and close their shared memories (the recorded ones keep their
+        # last state)
+        nb_removed = int.from_bytes(bytes=self.__socket.recv(2), byteorder='big')
+        for object_id in [int.from_bytes(bytes=self.__socket.recv(2), byteorder='big') for _ in range(nb_removed)]:
+            if self.__objects[object_id] is not None:
+                self.plt.remove(self.__objects[object_id].object, at=self.__at)
+                self.__memories[object_id].close()
+                self.__objects[object_id], self.__memories[object_id] = None, None
+
+        # Create the new visual objects, with the visibility of the other visual objects
+        nb_added = int.from_bytes(bytes=self.__socket.recv(2), byteorder='big')
+        for _ in range(nb_added):
+            self.__receive_object()
+            if self.__objects[-1] is not None:
+                self.plt.add(self.__objects[-1].object, at=self.__at)
+                if not self.active:
+                    self.__objects[-1].object.off()
+        self.__nb_structures += 1
+
+    @property
+    def capture_requested(self) -> bool:
+        """
+        Check if the do_capture flag is turned on by the simulation process.
+        """
+
+        return self.__sync_arr[3] == 1
+
+    def capture(self) -> None:
+        """
+        Read back the render window in the shared image buffers, then notify the simulation process.
+        """
+
+        # The window must keep the size of the shared buffers, otherwise VTK would reallocate the arrays
+        width, height = self.__capture_size
+        if tuple(self.plt.window.GetSize()) != (width, height):
+            self.plt.window.SetSize(width, height)
+            self.plt.render()
+
+        # Read back the color and depth buffers directly in the shared memories
+        self.plt.window.GetPixelData(0, 0, width - 1, height - 1, 0, self.__capture_vtk[0])
+        self.plt.window.GetZbufferData(0, 0, width - 1, height - 1, self.__capture_vtk[1])
+
+        # Notify the simulation process
+        self.__socket.send(b'done')
+
+    def set_frame(self, idx: int, alpha: float = 0.) -> None:
+        """
+        Update the visual objects with a recorded frame.
+
+        :param idx: Index of the frame.
+        :param alpha: If positive, the positions are linearly interpolated between this frame and the next one.
+        """
+
+        frame = self.__prefetcher.get(idx=idx, nb_frames=self.nb_frames)
+        if alpha > 0 and idx + 1 < self.nb_frames:
+            next_frame = self.__prefetcher.get(idx=idx + 1, nb_frames=self.nb_frames, move=False)
+            for (o, _), data, next_data in zip(self.__recorded, frame, next_frame):
+                o.set_frame(data=o.interpolate(data=data, next_data=next_data, alpha=alpha))
+        else:
+            for (o, _), data in zip(self.__recorded, frame):
+                o.set_frame(data=data)
 
     def close(self):
         """
@@ -137,43 +413,244 @@ class Factory:
         # Close the connection with the shared memories (synchronization array and each visual object array)
         try:
             self.__sync_sm.close()
+            self.__time_sm.close()
         except OSError:
             pass
 
-        for memory in self.__memories:
-            memory.close()
+        for capture_sm in self.__capture_sm:
+            capture_sm.close()
 
-        # Notify the simulation
-        self.__socket.send(b'done')
-
-        # Wait for the simulation process to close connections with the shared memories
-        self.__socket.recv(4)
+        for memory in self.__memories:
+            if memory is not None:
+                memory.close()
+
+        # Save the recording (removed if the storage is temporary)
+        self.__prefetcher.close()
+        if self.__storage is not None:
+            for _, memory in self.__recorded:
+                memory.save()
+            save(join(self.__storage.directory, 'times.npy'), self.times)
+            self.__storage.close(manifest={'nb_frames': self.nb_frames,
+                                           'objects': [{'type': o.object_type, 'fields': m.describe()}
+                                                       for o, m in self.__recorded]})
+            self.__storage = None
+
+        # Notify the simulation, then wait for the simulation process to close connections with the shared memories
+        # (unless it was already released)
+        if not self.__detached:
+            self.__socket.send(b'done')
+            self.__socket.recv(4)
 
         # Close socket
         self.__socket.close()
 
 
+class ReplayFactory:
+
+    def __init__(self, record_dir: str, plotter: Plotter):
+        """
+        This class is used to load the visualization data from a recording, without any simulation process.
+
+        :param record_dir: Directory of the recording.
+        :param plotter: Plotter instance.
+        """
+
+        # Load the scene manifest, the histories are then streamed from the disk
+        self.__storage = Storage(directory=record_dir)
+        manifest = self.__storage.load_manifest()
+        self.__nb_frames: int = manifest['nb_frames']
+
+        # Create the visual objects from the first recorded frame
+        self.__objects: List[Object] = []
+        for description in manifest['objects']:
+            memory = Record(storage=self.__storage, fields=description['fields'], nb_frames=self.__nb_frames)
+            self.__objects.append(Object(object_type=description['type'], memory=memory, plotter=plotter))
+
+        # Load the time stamps of the recorded frames (frames are considered at 30 fps if not available)
+        if exists(join(record_dir, 'times.npy')):
+            self.__times = np_load(join(record_dir, 'times.npy'), mmap_mode='r')
+        else:
+            self.__times = arange(self.__nb_frames).repeat(2).reshape(-1, 2) / 30
+
+        # Prepare the recorded frames around the cursor in a background thread
+        self.__prefetcher = FramePrefetcher(prepare=lambda idx: [o.prepare(idx=idx) for o in self.__objects])
+
+        # Plotter instance
+        self.plt = plotter
+        self.active = True
+
+    @property
+    def vedo_objects(self) -> List[Points]:
+        """
+        Get the list of visual objects in the factory.
+        """
+
+        return [o.object for o in self.__objects]
+
+    @property
+    def is_open(self) -> bool:
+        return True
+
+    @property
+    def count(self) -> int:
+        return self.__nb_frames - 1
+
+    @property
+    def nb_frames(self) -> int:
+        return self.__nb_frames
+
+    @property
+    def times(self) -> ndarray:
+        return self.__times
+
+    @property
+    def capture_requested(self) -> bool:
+        return False
+
+    def listen(self) -> None:
+        pass
+
+    def update(self) -> None:
+        pass
+
+    def set_frame(self, idx: int, alpha: float = 0.) -> None:
+        """
+        Update the visual objects with a recorded frame.
+
+        :param idx: Index of the frame.
+        :param alpha: If positive, the positions are linearly interpolated between this frame and the next one.
+        """
+
+        frame = self.__prefetcher.get(idx=idx, nb_frames=self.nb_frames)
+        if alpha > 0 and idx + 1 < self.nb_frames:
+            next_frame = self.__prefetcher.get(idx=idx + 1, nb_frames=self.nb_frames, move=False)
+            for o, data, next_data in zip(self.__objects, frame, next_frame):
+                o.set_frame(data=o.interpolate(data=data, next_data=next_data, alpha=alpha))
+        else:
+            for o, data in zip(self.__objects, frame):
+                o.set_frame(data=data)
+
+    def close(self) -> None:
+        """
+        Close the recording.
+        """
+
+        self.__prefetcher.close()
+        self.__storage.close()
+
+
 class Object:
 
-    def __init__(self, object_type: str, memory: Memory, plotter: Plotter):
+    def __init__(self, object_type: str, memory: Memory, plotter: Plotter, at: Optional[int] = None):
         """
         This class gathers the methods to create and update visual object instances.
 
         :param object_type: Object type (mesh, points...).
         :param memory: Shared memories access.
+        :param at: Index of the renderer of the visual object in the Plotter (current renderer by default).
         """
 
         # Shared memories access
         self.__memory = memory
 
         # Create the visual object instance
+        self.object_type = object_type
         self.object: Optional[Points] = None
         self.plt = plotter
+        self.at = at
         self.__getattribute__(f'_create_{object_type}')()
 
         # Define the update method depending on the visual object type
-        self.update = self.__getattribute__(f'_update_{object_type}')
-        self.set_frame = self.__getattribute__(f'_set_frame_{object_type}')
+        self.__update = self.__getattribute__(f'_update_{object_type}')
+        self.__set_frame = self.__getattribute__(f'_set_frame_{object_type}')
+        self.__prepare = self.__getattribute__(f'_prepare_{object_type}')
+
+        # Versions of the displayed data fields (None for the latest frame of the memory)
+        self.__versions: Optional[Dict[str, Any]] = None
+
+        # Data fields applied with the next update in addition to the dirty ones
+        self.__stale: Set[str] = set()
+
+    def update(self) -> None:
+        """
+        Update the visual object with the shared data fields.
+        """
+
+        # After a seek, the displayed data fields that differ from the latest ones are applied with the dirty ones, so
+        # that every displayed data field is then the latest one
+        if self.__versions is not None:
+            latest = self.__memory.versions
+            self.__stale = {field_name for field_name, version in self.__versions.items()
+                            if latest.get(field_name) != version}
+        self.__update()
+        self.__stale = set()
+        self.__versions = None
+
+    def __get(self) -> Tuple[Dict[str, ndarray], Dict[str, Any]]:
+        """
+        Access the shared arrays of the data fields and the fields to apply (dirty or stale after a seek).
+        """
+
+        data, dirty = self.__memory.get()
+        if len(self.__stale) == 0:
+            return data, dirty
+        return data, {field_name: dirty[field_name] or field_name in self.__stale for field_name in dirty}
+
+    def prepare(self, idx: int) -> Dict[str, Any]:
+        """
+        Decode the recorded data fields at a given frame and prepare them to update the visual object (this method
+        does not access the VTK objects so that it can be executed in a background thread).
+
+        :param idx: Index of the frame.
+        """
+
+        # Scalar data fields are converted to python values
+        data = {field_name: value.item() if value.shape == () else value
+                for field_name, value in self.__memory.get_frame(idx=idx).items()}
+        self.__prepare(data)
+        data['versions'] = self.__memory.get_versions(idx=idx)
+        return data
+
+    def interpolate(self, data: Dict[str, Any], next_data: Dict[str, Any], alpha: float) -> Dict[str, Any]:
+        """
+        Linearly interpolate the positions between two prepared frames.
+
+        :param data: Prepared data of the frame.
+        :param next_data: Prepared data of the next frame.
+        :param alpha: Interpolation factor between 0 (frame) and 1 (next frame).
+        """
+
+        # Check if the geometry changed between the two frames
+        versions = data['versions']
+        moving = {field_name for field_name in POSITION_FIELDS & versions.keys()
+                  if versions[field_name] != next_data['versions'][field_name]}
+        if len(moving) == 0:
+            return data
+
+        # The interpolated positions are not a recorded version of the data fields, they are identified by the two
+        # recorded versions and by the interpolation factor (so that each sub-frame is applied, and never matches a
+        # recorded or a live version)
+        data = dict(data)
+        for field_name in POSITION_FIELDS & data.keys():
+            data[field_name] = (1 - alpha) * data[field_name] + alpha * next_data[field_name]
+        data['versions'] = {**versions, **{field_name: (versions[field_name], next_data['versions'][field_name], alpha)
+                                           for field_name in moving}}
+        return data
+
+    def set_frame(self, data: Dict[str, Any]) -> None:
+        """
+        Update the visual object with a recorded frame, only the data fields that differ from the displayed ones are
+        applied.
+
+        :param data: Prepared data of the frame.
+        """
+
+        displayed = self.__memory.versions if self.__versions is None else self.__versions
+        changed = {field_name for field_name, version in data['versions'].items()
+                   if displayed.get(field_name) != version}
+        if len(changed) > 0:
+            self.__set_frame(data=data, changed=changed)
+        self.__versions = data['versions']
 
     def _create_mesh(self) -> None:
         """
@@ -182,11 +659,12 @@ class Object:
 
         # Access data fields
         data, _ = self.__memory.get()
-        cells = data['cells'] if len(data['cells'].shape) > 1 else get_mesh_cells(flat_cells=data['cells'])
 
-        # Create instance
+        # Create instance (the VTK cells are shared by the meshes with the same topology)
         color = data['color'].item() if len(data['color'].shape) == 0 else data['color']
-        self.object = Mesh(inputobj=[data['positions'], cells], c=color, alpha=data['alpha'].item())
+        polydata = buildPolyData(vertices=data['positions'])
+        polydata.SetPolys(get_cell_array(cells=data['cells'], key=self.__memory.content_key(field_name='cells')))
+        self.object = Mesh(inputobj=polydata, c=color, alpha=data['alpha'].item())
         self.object.wireframe(value=data['wireframe'].item()).lw(linewidth=data['line_width'].item())
 
         # Apply cmap
@@ -207,7 +685,7 @@ class Object:
         """
 
         self.object: Mesh
-        data, dirty = self.__memory.get()
+        data, dirty = self.__get()
 
         # Update positions
         if dirty['positions']:
@@ -218,7 +696,7 @@ class Object:
             self.object.color(data['color'].item() if len(data['color'].shape) == 0 else data['color'])
         if dirty['alpha']:
             self.object.alpha(data['alpha'].item())
-        if dirty['colormap_field']:
+        if dirty['colormap_field'] or (dirty['color'] and not isnan(data['colormap_field']).any()):
             if not isnan(data['colormap_range']).any():
                 self.object.cmap(input_cmap=data['colormap'].item(),
                                  input_array=data['colormap_field'],
@@ -233,32 +711,44 @@ class Object:
         if dirty['line_width']:
             self.object.linewidth(data['line_width'].item())
 
-    def _set_frame_mesh(self, idx: int) -> None:
+    def _prepare_mesh(self, data: Dict[str, Any]) -> None:
+        """
+        Prepare the recorded data of a mesh instance.
+        """
+
+        data['has_cmap'] = not isnan(data['colormap_field']).any()
+        data['has_range'] = not isnan(data['colormap_range']).any()
+
+    def _set_frame_mesh(self, data: Dict[str, Any], changed: Set[str]) -> None:
         """
         Update a mesh instance.
         """
 
         self.object: Mesh
-        data = self.__memory.get_frame(idx=idx)
 
         # Update positions
-        self.object.vertices = data['positions']
+        if 'positions' in changed:
+            self.object.vertices = data['positions']
 
         # Update color
-        self.object.color(data['color'].item() if len(data['color'].shape) == 0 else data['color'])
-        self.object.alpha(data['alpha'].item())
-        if not isnan(data['colormap_field']).any():
-            if not isnan(data['colormap_range']).any():
-                self.object.cmap(input_cmap=data['colormap'].item(),
+        if 'color' in changed:
+            self.object.color(data['color'])
+        if 'alpha' in changed:
+            self.object.alpha(data['alpha'])
+        if data['has_cmap'] and len(changed & (RECOLOR_FIELDS)) > 0:
+            if data['has_range']:
+                self.object.cmap(input_cmap=data['colormap'],
                                  input_array=data['colormap_field'],
                                  vmin=data['colormap_range'][0], vmax=data['colormap_range'][1])
             else:
-                self.object.cmap(input_cmap=data['colormap'].item(),
+                self.object.cmap(input_cmap=data['colormap'],
                                  input_array=data['colormap_field'])
 
         # Update rendering style
-        self.object.wireframe(data['wireframe'].item())
-        self.object.linewidth(data['line_width'].item())
+        if 'wireframe' in changed:
+            self.object.wireframe(data['wireframe'])
+        if 'line_width' in changed:
+            self.object.linewidth(data['line_width'])
 
     def _create_points(self) -> None:
         """
@@ -287,7 +777,7 @@ class Object:
         """
 
         self.object: Points
-        data, dirty = self.__memory.get()
+        data, dirty = self.__get()
 
         # Update positions
         if dirty['positions']:
@@ -298,7 +788,7 @@ class Object:
             self.object.color(data['color'].item() if len(data['color'].shape) == 0 else data['color'])
         if dirty['alpha']:
             self.object.alpha(data['alpha'].item())
-        if dirty['colormap_field']:
+        if dirty['colormap_field'] or (dirty['color'] and not isnan(data['colormap_field']).any()):
             if not isnan(data['colormap_range']).any():
                 self.object.cmap(input_cmap=data['colormap'].item(),
                                  input_array=data['colormap_field'],
@@ -310,30 +800,41 @@ class Object:
         if dirty['point_size']:
             self.object.point_size(data['point_size'].item())
 
-    def _set_frame_points(self, idx: int):
+    def _prepare_points(self, data: Dict[str, Any]) -> None:
+        """
+        Prepare the recorded data of a point cloud instance.
+        """
+
+        data['has_cmap'] = not isnan(data['colormap_field']).any()
+        data['has_range'] = not isnan(data['colormap_range']).any()
+
+    def _set_frame_points(self, data: Dict[str, Any], changed: Set[str]) -> None:
         """
         Update a point cloud instance.
         """
 
         self.object: Points
-        data = self.__memory.get_frame(idx=idx)
 
         # Update positions
-        self.object.vertices = data['positions']
+        if 'positions' in changed:
+            self.object.vertices = data['positions']
 
         # Update color
-        self.object.color(data['color'].item() if len(data['color'].shape) == 0 else data['color'])
-        self.object.alpha(data['alpha'].item())
-        if not isnan(data['colormap_field']).any():
-            if not isnan(data['colormap_range']).any():
-                self.object.cmap(input_cmap=data['colormap'].item(),
+        if 'color' in changed:
+            self.object.color(data['color'])
+        if 'alpha' in changed:
+            self.object.alpha(data['alpha'])
+        if data['has_cmap'] and len(changed & (RECOLOR_FIELDS)) > 0:
+            if data['has_range']:
+                self.object.cmap(input_cmap=data['colormap'],
                                  input_array=data['colormap_field'],
                                  vmin=data['colormap_range'][0], vmax=data['colormap_range'][1])
             else:
-                self.object.cmap(input_cmap=data['colormap'].item(), input_array=data['colormap_field'])
+                self.object.cmap(input_cmap=data['colormap'], input_array=data['colormap_field'])
 
         # Update rendering style
-        self.object.point_size(data['point_size'].item())
+        if 'point_size' in changed:
+            self.object.point_size(data['point_size'])
 
     def _create_arrows(self) -> None:
         """
@@ -363,20 +864,24 @@ class Object:
         """
 
         self.object: Arrows
-        data, dirty = self.__memory.get()
+        data, dirty = self.__get()
 
-        # Update positions & vectors
+        # Update positions & vectors (the new instance keeps the visibility of the previous one, which is hidden if the
+        # visual objects of the factory are not active)
         if dirty['positions'] or dirty['vectors']:
-            self.plt.remove(self.object)
+            visible = self.object.actor.GetVisibility()
+            self.plt.remove(self.object, at=self.at)
             self._create_arrows()
-            self.plt.add(self.object)
+            if not visible:
+                self.object.off()
+            self.plt.add(self.object, at=self.at)
 
         # Update color
         if dirty['color']:
             self.object.color(data['color'].item() if len(data['color'].shape) == 0 else data['color'])
         if dirty['alpha']:
             self.object.alpha(data['alpha'].item())
-        if dirty['colormap_field']:
+        if dirty['colormap_field'] or (dirty['color'] and not isnan(data['colormap_field']).any()):
             if not isnan(data['colormap_range']).any():
                 cmap_norm = Normalize(vmin=float(data['colormap_range'][0]),
                                       vmax=float(data['colormap_range'][1]))
@@ -385,31 +890,48 @@ class Object:
             cmap = get_cmap(data['colormap'].item())
             self.object.color(c=cmap(cmap_norm(data['colormap_field']))[:, :3])
 
-    def _set_frame_arrows(self, idx: int):
+    def _prepare_arrows(self, data: Dict[str, Any]) -> None:
         """
-        Update an arrows instance.
+        Prepare the recorded data of an arrows instance (end points and colormap).
         """
 
-        self.object: Arrows
-        data = self.__memory.get_frame(idx=idx)
-
-        self.plt.remove(self.object)
-
-        # Create instance
-        color = data['color'].item() if len(data['color'].shape) == 0 else data['color']
-        self.object = Arrows(start_pts=data['positions'], end_pts=data['positions'] + data['vectors'],
-                             c=color, alpha=data['alpha'].item())
-
-        # Apply cmap
+        data['end_positions'] = data['positions'] + data['vectors']
+        data['colors'] = None
         if not isnan(data['colormap_field']).any():
             if not isnan(data['colormap_range']).any():
                 cmap_norm = Normalize(vmin=float(data['colormap_range'][0]), vmax=float(data['colormap_range'][1]))
             else:
                 cmap_norm = Normalize(vmin=min(data['colormap_field']), vmax=max(data['colormap_field']))
-            cmap = get_cmap(data['colormap'].item())
-            self.object.color(c=cmap(cmap_norm(data['colormap_field']))[:, :3])
+            data['colors'] = get_cmap(data['colormap'])(cmap_norm(data['colormap_field']))[:, :3]
 
-        self.plt.add(self.object)
+    def _set_frame_arrows(self, data: Dict[str, Any], changed: Set[str]) -> None:
+        """
+        Update an arrows instance.
+        """
+
+        self.object: Arrows
+
+        # The arrows geometry is only created again if positions or vectors changed (with the visibility of the
+        # previous instance)
+        if 'positions' in changed or 'vectors' in changed:
+            visible = self.object.actor.GetVisibility()
+            self.plt.remove(self.object, at=self.at)
+            self.object = Arrows(start_pts=data['positions'], end_pts=data['end_positions'],
+                                 c=data['color'], alpha=data['alpha'])
+            if data['colors'] is not None:
+                self.object.color(c=data['colors'])
+            if not visible:
+                self.object.off()
+            self.plt.add(self.object, at=self.at)
+            return
+
+        # Update color
+        if 'color' in changed:
+            self.object.color(data['color'])
+        if 'alpha' in changed:
+            self.object.alpha(data['alpha'])
+        if data['colors'] is not None and len(changed & (RECOLOR_FIELDS)) > 0:
+            self.object.color(c=data['colors'])
 
     def _create_lines(self):
         """
@@ -431,7 +953,7 @@ class Object:
         """
 
         self.object: Lines
-        data, dirty = self.__memory.get()
+        data, dirty = self.__get()
 
         # Update positions
         if dirty['start_positions'] or dirty['end_positions']:
@@ -447,13 +969,34 @@ class Object:
         if dirty['line_width']:
             self.object.linewidth(data['line_width'].item())
 
-    def _set_frame_lines(self, idx: int):
+    def _prepare_lines(self, data: Dict[str, Any]) -> None:
+        """
+        Prepare the recorded data of a lines instance (interleaved vertices).
+        """
+
+        data['vertices'] = array([data['start_positions'], data['end_positions']]).T.reshape((3, -1)).T
+
+    def _set_frame_lines(self, data: Dict[str, Any], changed: Set[str]) -> None:
         """
         Update a lines instance.
         """
 
         self.object: Lines
 
+        # Update positions
+        if 'start_positions' in changed or 'end_positions' in changed:
+            self.object.vertices = data['vertices']
+
+        # Update color
+        if 'color' in changed:
+            self.object.color(data['color'])
+        if 'alpha' in changed:
+            self.object.alpha(data['alpha'])
+
+        # Update rendering style
+        if 'line_width' in changed:
+            self.object.linewidth(data['line_width'])
+
     def _create_text(self):
         """
         Create a text instance.
@@ -484,7 +1027,7 @@ class Object:
         """
 
         self.object: Text2D
-        data, dirty = self.__memory.get()
+        data, dirty = self.__get()
 
         # Update content
         if dirty['content']:
@@ -503,22 +1046,32 @@ class Object:
         if dirty['italic']:
             self.object.italic(data['italic'].item())
 
-    def _set_frame_text(self, idx: int):
+    def _prepare_text(self, data: Dict[str, Any]) -> None:
         """
-        Create a text instance.
+        Prepare the recorded data of a text instance.
+        """
+
+        pass
+
+    def _set_frame_text(self, data: Dict[str, Any], changed: Set[str]) -> None:
+        """
+        Update a text instance.
         """
 
         self.object: Text2D
-        data = self.__memory.get_frame(idx=idx)
 
         # Update content
-        # content = data['content'].item().to_bytes((data['content'].item().bit_length() + 7) // 8, 'little')
+        # content = data['content'].to_bytes((data['content'].bit_length() + 7) // 8, 'little')
         # content = content.decode('utf-8')
-        content = data['content'].item()
-        self.object.text(txt=content)
+        if 'content' in changed:
+            self.object.text(txt=data['content'])
 
         # Update color
-        self.object.color(data['color'].item() if len(data['color'].shape) == 0 else data['color'])
+        if 'color' in changed:
+            self.object.color(data['color'])
 
         # Update rendering style
-        self.object.bold(data['bold'].item()).italic(data['italic'].item())
+        if 'bold' in changed:
+            self.object.bold(data['bold'])
+        if 'italic' in changed:
+            self.object.italic(data['italic'])
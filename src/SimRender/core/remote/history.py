@@ -0,0 +1,376 @@
+from typing import List, Optional, Tuple, Dict, Callable, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Lock
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import makedirs, remove
+from os.path import join
+from glob import glob
+from json import dump, load
+from zlib import compress, decompress
+from numpy import ndarray, array, empty, memmap, save, load as np_load, frombuffer, ascontiguousarray, rint, diff, \
+    cumsum, isfinite, abs as np_abs, uint8, uint32, int64, iinfo, finfo, dtype as np_dtype
+
+
+class Storage:
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 ram_budget: int = 512,
+                 chunk_size: int = 64,
+                 keyframe_interval: int = 32,
+                 precision: float = 1e-5):
+        """
+        This class manages the on-disk storage of the histories with a bounded RAM cache of chunks.
+        Each history is written in its own file by compressed chunks of records, then chunks are loaded back through
+        memory maps when required and kept in RAM until the budget is exceeded (least recently used chunks are evicted
+        first). Encoding and decoding are performed in a background thread.
+
+        :param directory: Directory of the history files (a temporary directory is created by default). A defined
+                          directory is kept as a recording that can be replayed offline, a previous recording in this
+                          directory is overwritten by a new one.
+        :param ram_budget: Maximum size in MB of the chunks loaded in RAM.
+        :param chunk_size: Maximum size in MB of a decoded chunk.
+        :param keyframe_interval: Maximum number of records in a chunk of floating point data (the first record of a
+                                  chunk is the keyframe, the next ones are stored as deltas).
+        :param precision: Quantization step of floating point data, relative to the amplitude of the chunk (0 for a
+                          lossless storage).
+        """
+
+        # Temporary directories are removed on close
+        self.__temporary = directory is None
+        self.directory = mkdtemp(prefix='simrender_') if directory is None else directory
+        makedirs(self.directory, exist_ok=True)
+
+        self.ram_budget = ram_budget * 2 ** 20
+        self.chunk_size = chunk_size * 2 ** 20
+        self.keyframe_interval = keyframe_interval
+        self.precision = precision
+        self.__nb_histories = 0
+
+        # LRU cache of the decoded chunks with format {(history_id, chunk_id): chunk}
+        self.__cache: OrderedDict[Tuple[int, int], ndarray] = OrderedDict()
+        self.__cache_size = 0
+        self.__lock = Lock()
+
+        # Background thread to encode, write and decode the chunks (a single worker keeps the writes ordered)
+        self.__worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='SimRender_history')
+        self.__pending: Dict[Tuple[int, int], Future] = {}
+
+    def register(self) -> int:
+        """
+        Get a unique ID for a new history.
+        """
+
+        # The files of a previous recording in the same directory are removed with the first history, otherwise the
+        # chunks would be appended to the previous ones
+        if self.__nb_histories == 0:
+            files = [join(self.directory, file) for file in ('manifest.json', 'times.npy')]
+            files += [file for pattern in ('*.bin', '*.seek.npy', '*.index.npy')
+                      for file in glob(join(self.directory, f'[0-9]{pattern}'))]
+            for file in files:
+                try:
+                    remove(file)
+                except FileNotFoundError:
+                    pass
+
+        self.__nb_histories += 1
+        return self.__nb_histories - 1
+
+    def submit(self, task: Callable[[], None]) -> None:
+        """
+        Execute a task in the background thread.
+
+        :param task: Function to execute.
+        """
+
+        self.__worker.submit(task)
+
+    def flush(self) -> None:
+        """
+        Wait for the background thread to execute the submitted tasks.
+        """
+
+        self.__worker.submit(lambda: None).result()
+
+    def load(self, key: Tuple[int, int], loader: Callable[[], ndarray]) -> ndarray:
+        """
+        Get a chunk from the cache, wait for its decoding in the background thread or load it.
+
+        :param key: Chunk key with format (history_id, chunk_id).
+        :param loader: Function to decode the chunk.
+        """
+
+        with self.__lock:
+            if key in self.__cache:
+                self.__cache.move_to_end(key)
+                return self.__cache[key]
+            future = self.__pending.get(key)
+        if future is not None:
+            return future.result()
+        return self.__insert(key=key, chunk=loader())
+
+    def prefetch(self, key: Tuple[int, int], loader: Callable[[], ndarray]) -> None:
+        """
+        Decode a chunk in the background thread if it is not already loaded.
+
+        :param key: Chunk key with format (history_id, chunk_id).
+        :param loader: Function to decode the chunk.
+        """
+
+        with self.__lock:
+            if key in self.__cache or key in self.__pending:
+                return
+            self.__pending[key] = self.__worker.submit(lambda: self.__insert(key=key, chunk=loader()))
+
+    def __insert(self, key: Tuple[int, int], chunk: ndarray) -> ndarray:
+        """
+        Add a decoded chunk in the cache, then evict the least recently used chunks if the RAM budget is exceeded.
+
+        :param key: Chunk key with format (history_id, chunk_id).
+        :param chunk: Decoded chunk.
+        """
+
+        with self.__lock:
+            self.__pending.pop(key, None)
+            if key not in self.__cache:
+                self.__cache[key] = chunk
+                self.__cache_size += chunk.nbytes
+            while self.__cache_size > self.ram_budget and len(self.__cache) > 1:
+                _, evicted = self.__cache.popitem(last=False)
+                self.__cache_size -= evicted.nbytes
+        return chunk
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """
+        Load the scene manifest of a recording.
+        """
+
+        with open(join(self.directory, 'manifest.json'), 'r') as file:
+            return load(file)
+
+    def close(self, manifest: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Wait for the background tasks, release the cache, then either remove the temporary history files or write the
+        scene manifest of the recording.
+
+        :param manifest: Description of the recorded scene (visual objects types, data fields and number of frames).
+        """
+
+        self.__worker.shutdown(wait=True)
+        with self.__lock:
+            self.__cache.clear()
+            self.__cache_size = 0
+        if self.__temporary:
+            rmtree(self.directory, ignore_errors=True)
+        elif manifest is not None:
+            with open(join(self.directory, 'manifest.json'), 'w') as file:
+                dump(manifest, file, indent=2)
+
+
+class History:
+
+    def __init__(self,
+                 storage: Storage,
+                 shape: Tuple[int, ...],
+                 dtype: np_dtype,
+                 history_id: Optional[int] = None,
+                 chunk_len: Optional[int] = None):
+        """
+        This class stores the sparse change log of a data field: a value is only recorded at the frames where the
+        data field changed. Records are written on disk by compressed chunks. Floating point data are quantized and
+        each chunk is encoded as a keyframe followed by deltas. A seek index maps each frame to its record, so that
+        any frame is located in constant time (the keyframe of a record being the first record of its chunk).
+
+        :param storage: Storage of the history files.
+        :param shape: Shape of the data field.
+        :param dtype: Type of the data field.
+        :param history_id: ID of a saved history to load from the storage directory (read-only).
+        :param chunk_len: Number of records in the chunks of the saved history.
+        """
+
+        self.__storage = storage
+        self.__id = storage.register() if history_id is None else history_id
+        self.__file = join(storage.directory, f'{self.__id}.bin')
+        self.__shape = tuple(shape)
+        self.__dtype = np_dtype(dtype)
+
+        # Saved history: the indices are memory mapped so that the loading time does not depend on the run length
+        if history_id is not None:
+            self.__seek = np_load(join(storage.directory, f'{self.__id}.seek.npy'), mmap_mode='r')
+            self.__index = np_load(join(storage.directory, f'{self.__id}.index.npy'), mmap_mode='r')
+            self.__nb_frames = len(self.__seek)
+            self.__nb_records = int(self.__seek[-1]) + 1 if self.__nb_frames > 0 else 0
+            self.__chunk_len = chunk_len
+            self.__buffer: Optional[ndarray] = None
+            return
+
+        # Seek index with format [record of each frame], grown while recording
+        self.__seek = empty(shape=(1024,), dtype=uint32)
+        self.__nb_frames = 0
+
+        # Index of the written chunks with format [(offset, nb_bytes, quantization_step, item_size)]
+        self.__index: List[Tuple[int, int, float, int]] = []
+        self.__offset = 0
+
+        # Only floating point data are stored as quantized deltas
+        self.__delta = self.__dtype.kind == 'f' and storage.precision > 0
+
+        # The last chunk is kept in RAM until it is full, then until it is written in the background thread
+        self.__nb_records = 0
+        record_size = max(1, empty(shape=self.__shape, dtype=dtype).nbytes)
+        self.__chunk_len = int(min(storage.keyframe_interval if self.__delta else 1024,
+                                   max(1, storage.chunk_size // record_size)))
+        self.__buffer = empty(shape=(self.__chunk_len, *self.__shape), dtype=dtype)
+        self.__unwritten: Dict[int, ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.__nb_records
+
+    def append(self, frame: int, value: ndarray) -> None:
+        """
+        Record a new value of the data field.
+
+        :param frame: Index of the frame.
+        :param value: New value of the data field (copied).
+        """
+
+        # Update the seek index: the frames without any change refer to the previous record
+        if frame >= len(self.__seek):
+            seek = empty(shape=(max(2 * len(self.__seek), frame + 1),), dtype=uint32)
+            seek[:self.__nb_frames] = self.__seek[:self.__nb_frames]
+            self.__seek = seek
+        if frame > self.__nb_frames:
+            self.__seek[self.__nb_frames:frame] = self.__nb_records - 1
+        self.__seek[frame] = self.__nb_records
+        self.__nb_frames = frame + 1
+
+        self.__buffer[self.__nb_records % self.__chunk_len] = value
+        self.__nb_records += 1
+
+        # Encode and write the full chunk in the background thread
+        if self.__nb_records % self.__chunk_len == 0:
+            chunk_id = self.__nb_records // self.__chunk_len - 1
+            self.__unwritten[chunk_id] = self.__buffer
+            self.__buffer = empty(shape=self.__buffer.shape, dtype=self.__dtype)
+            self.__storage.submit(lambda: self.__write(chunk_id=chunk_id))
+
+    def get(self, frame: int) -> ndarray:
+        """
+        Get the latest recorded value at or before a frame.
+
+        :param frame: Index of the frame.
+        """
+
+        chunk_id, offset = self.locate(frame=frame)
+
+        # The last chunk is still in RAM
+        if self.__buffer is not None:
+            if chunk_id == self.__nb_records // self.__chunk_len:
+                return self.__buffer[offset]
+            if (chunk := self.__unwritten.get(chunk_id)) is not None:
+                return chunk[offset]
+
+        # Decode the chunk, then prepare the neighbor chunks in the background thread
+        chunk = self.__storage.load(key=(self.__id, chunk_id), loader=lambda: self.__read(chunk_id=chunk_id))
+        for neighbor_id in (chunk_id - 1, chunk_id + 1):
+            if 0 <= neighbor_id < len(self.__index):
+                self.__storage.prefetch(key=(self.__id, neighbor_id),
+                                        loader=lambda i=neighbor_id: self.__read(chunk_id=i))
+        return chunk[offset]
+
+    def record(self, frame: int) -> int:
+        """
+        Get the index of the latest recorded value at or before a frame (the version of the data field at this frame).
+
+        :param frame: Index of the frame.
+        """
+
+        return max(0, int(self.__seek[frame]) if frame < self.__nb_frames else self.__nb_records - 1)
+
+    def locate(self, frame: int) -> Tuple[int, int]:
+        """
+        Get the location of the latest recorded value at or before a frame with format (chunk_id, record_in_chunk).
+
+        :param frame: Index of the frame.
+        """
+
+        return divmod(self.record(frame=frame), self.__chunk_len)
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Get the description of the history required to load it from the storage directory.
+        """
+
+        return {'id': self.__id, 'shape': list(self.__shape), 'dtype': self.__dtype.str, 'chunk_len': self.__chunk_len}
+
+    def save(self) -> None:
+        """
+        Write the last chunk and the indices of the history in the storage directory (in the background thread).
+        """
+
+        def __save():
+            if self.__nb_records % self.__chunk_len > 0:
+                chunk_id = self.__nb_records // self.__chunk_len
+                self.__unwritten[chunk_id] = self.__buffer[:self.__nb_records % self.__chunk_len]
+                self.__write(chunk_id=chunk_id)
+            directory = self.__storage.directory
+            save(join(directory, f'{self.__id}.seek.npy'), self.__seek[:self.__nb_frames])
+            save(join(directory, f'{self.__id}.index.npy'), array(self.__index, dtype=float).reshape(-1, 4))
+
+        self.__storage.submit(__save)
+
+    @property
+    def sizes(self) -> Tuple[int, int]:
+        """
+        Get the raw size and the stored size of the written chunks.
+        """
+
+        return len(self.__index) * self.__buffer.nbytes, self.__offset
+
+    def __write(self, chunk_id: int) -> None:
+        """
+        Encode a full chunk and append it to the history file.
+
+        :param chunk_id: Index of the chunk.
+        """
+
+        chunk = self.__unwritten[chunk_id]
+
+        # Quantize the floating point data, then replace each record but the keyframe by its delta (non-finite data
+        # are stored without loss)
+        step = 0.
+        if self.__delta and isfinite(chunk).all():
+            step = self.__storage.precision * max(float(np_abs(chunk).max()), finfo(float).tiny)
+            chunk = rint(chunk / step).astype(int64)
+            chunk[1:] = diff(chunk, axis=0)
+            bound = int(np_abs(chunk).max())
+            chunk = chunk.astype(next(f'i{size}' for size in (1, 2, 4, 8) if bound <= iinfo(f'i{size}').max))
+
+        # Shuffle the bytes of the items so that the compression benefits from the small deltas
+        item_size = chunk.dtype.itemsize
+        data = compress(ascontiguousarray(chunk.reshape(-1).view(uint8).reshape(-1, item_size).T), 1)
+        with open(self.__file, 'ab' if self.__offset > 0 else 'wb') as file:
+            file.write(data)
+        self.__index.append((self.__offset, len(data), step, item_size))
+        self.__offset += len(data)
+        del self.__unwritten[chunk_id]
+
+    def __read(self, chunk_id: int) -> ndarray:
+        """
+        Load and decode a chunk from the history file.
+
+        :param chunk_id: Index of the chunk.
+        """
+
+        offset, nb_bytes, step, item_size = self.__index[chunk_id]
+        offset, nb_bytes, item_size = int(offset), int(nb_bytes), int(item_size)
+        data = decompress(memmap(self.__file, dtype=uint8, mode='r', offset=offset, shape=(nb_bytes,)))
+        data = ascontiguousarray(frombuffer(data, dtype=uint8).reshape(item_size, -1).T)
+        if step == 0:
+            return data.view(self.__dtype).reshape((-1, *self.__shape))
+
+        # Accumulate the deltas from the keyframe
+        data = data.view(f'i{item_size}').reshape((-1, *self.__shape))
+        return (cumsum(data, axis=0, dtype=int64) * step).astype(self.__dtype)
@@ -1,20 +1,69 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Set, Tuple, Optional, Any
 from socket import socket
+from threading import Lock
 from multiprocessing.shared_memory import SharedMemory
 from numpy import array, ndarray, frombuffer, dtype as np_dtype
 
+from SimRender.core.remote.history import Storage, History
+from SimRender.core.local.memory import CONSTANT_PREFIX
+
+
+# Content addressed shared memories, attached once for all the visual objects (and all the simulations of a batch)
+# with format {name: [value_sm, dirty_sm, nb_references]}
+_constants: Dict[str, List[Any]] = {}
+_constants_lock = Lock()
+
+
+def _attach(sm_name: str) -> Tuple[SharedMemory, SharedMemory]:
+    """
+    Attach to the shared memories of a data field and of its dirty flag.
+
+    :param sm_name: Name of the shared memory of the data field.
+    """
+
+    if not sm_name.startswith(CONSTANT_PREFIX):
+        return SharedMemory(create=False, name=sm_name), SharedMemory(create=False, name=f'{sm_name}_dirty')
+    with _constants_lock:
+        if sm_name not in _constants:
+            _constants[sm_name] = [SharedMemory(create=False, name=sm_name),
+                                   SharedMemory(create=False, name=f'{sm_name}_dirty'), 0]
+        _constants[sm_name][2] += 1
+        return _constants[sm_name][0], _constants[sm_name][1]
+
+
+def _detach(sm_name: str, buffers: List[SharedMemory]) -> None:
+    """
+    Close the shared memories of a data field and of its dirty flag (the constant ones with their last reference).
+
+    :param sm_name: Name of the shared memory of the data field.
+    :param buffers: Shared memories of the data field and of its dirty flag.
+    """
+
+    with _constants_lock:
+        if sm_name in _constants:
+            _constants[sm_name][2] -= 1
+            if _constants[sm_name][2] > 0:
+                return
+            del _constants[sm_name]
+    buffers[0].close()
+    buffers[1].close()
+
 
 class Memory:
 
-    def __init__(self, remote: socket, store_data: bool):
+    def __init__(self, remote: socket, storage: Optional[Storage] = None, tracked: Optional[List[str]] = None):
         """
         This class loads the shared arrays from the simulation process for each data field of a visual object.
 
         :param remote: Remote socket to communicate with.
+        :param storage: If defined, the history of the data fields is recorded in this storage.
+        :param tracked: Data fields whose changes are recorded (all by default), the other ones only keep their initial
+                        value in the history.
         """
 
         # Create the shared memories container
         self.__buffers: Dict[str, List[SharedMemory]] = {}
+        self.__names: Dict[str, str] = {}
 
         # Create the shared array containers for data and dirty flags
         self.__data: Dict[str, ndarray] = {}
@@ -37,36 +86,171 @@ class Memory:
             dirty = array(False, dtype=bool)
 
             # Load the shared memories buffers for the data field and the associated dirty flag
-            value_sm = SharedMemory(create=False, name=sm_name)
-            dirty_sm = SharedMemory(create=False, name=f'{sm_name}_dirty')
+            value_sm, dirty_sm = _attach(sm_name=sm_name)
             self.__buffers[field_name] = [value_sm, dirty_sm]
+            self.__names[field_name] = sm_name
 
             # Load the shared arrays for the data field and the associated dirty flag
             self.__data[field_name] = ndarray(shape=shape, dtype=dtype, buffer=value_sm.buf)
             self.__dirty[field_name] = ndarray(shape=dirty.shape, dtype=dirty.dtype, buffer=dirty_sm.buf)
 
-        if store_data:
-            self.memory = {field_name: [] for field_name in self.__data.keys()}
-        self.get = self.__get if not store_data else self.__get_and_store
+        # Create the sparse change log of each data field if required
+        self.history: Dict[str, History] = {}
+        self.nb_frames = 0
 
-    def __get(self) -> Tuple[Dict[str, ndarray], Dict[str, ndarray]]:
-        return self.__data, self.__dirty
+        # Version of each data field in the latest frame (index of the latest record)
+        self.versions: Dict[str, int] = {}
+
+        # Tracked data fields that changed since the latest recorded frame
+        self.__tracked = set(self.__data.keys()) if tracked is None else set(tracked) & self.__data.keys()
+        self.__changed: Set[str] = set()
+        if storage is not None:
+            self.history = {field_name: History(storage=storage, shape=data.shape, dtype=data.dtype)
+                            for field_name, data in self.__data.items()}
+
+    def get(self) -> Tuple[Dict[str, ndarray], Dict[str, ndarray]]:
+        """
+        Access the shared arrays of the data fields and of the dirty flags.
+        """
 
-    def __get_and_store(self) -> Tuple[Dict[str, ndarray], Dict[str, ndarray]]:
-        for field_name in self.memory.keys():
-            self.memory[field_name].append(array(self.__data[field_name]))
         return self.__data, self.__dirty
 
+    def content_key(self, field_name: str) -> Optional[str]:
+        """
+        Get the key of the content of a constant data field, shared by the visual objects with the same content (None
+        if the data field is not content addressed).
+
+        :param field_name: Name of the data field.
+        """
+
+        sm_name = self.__names.get(field_name, '')
+        return sm_name if sm_name.startswith(CONSTANT_PREFIX) else None
+
+    def store(self, record: bool = True) -> None:
+        """
+        Record the tracked data fields that changed since the previous recorded frame (every data field is recorded
+        for the first one).
+
+        :param record: If False, the changes of the current step are only accumulated until the next recorded frame.
+        """
+
+        # Accumulate the changes of the steps that are not recorded (the latest values are not a recorded version)
+        dirty = {field_name for field_name in self.history.keys() if self.__dirty[field_name]}
+        self.__changed.update(dirty & self.__tracked)
+        self.versions.update({field_name: -1 for field_name in dirty - self.__tracked})
+        if not record:
+            self.versions.update({field_name: -1 for field_name in self.__changed})
+            return
+
+        for field_name, history in self.history.items():
+            if self.nb_frames == 0 or field_name in self.__changed:
+                history.append(frame=self.nb_frames, value=self.__data[field_name])
+                self.versions[field_name] = len(history) - 1
+        self.__changed.clear()
+        self.nb_frames += 1
+
     def get_frame(self, idx: int) -> Dict[str, ndarray]:
+        """
+        Get the recorded value of each data field at a given frame.
+
+        :param idx: Index of the frame.
+        """
 
-        return {field_name: self.memory[field_name][idx] for field_name in self.memory.keys()}
+        return {field_name: history.get(frame=idx) for field_name, history in self.history.items()}
+
+    def get_versions(self, idx: int) -> Dict[str, int]:
+        """
+        Get the version of each data field at a given frame.
+
+        :param idx: Index of the frame.
+        """
+
+        return {field_name: history.record(frame=idx) for field_name, history in self.history.items()}
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the description of the history of each data field.
+        """
+
+        return {field_name: history.describe() for field_name, history in self.history.items()}
+
+    def save(self) -> None:
+        """
+        Save the history of each data field in the storage directory.
+        """
+
+        for history in self.history.values():
+            history.save()
 
     def close(self) -> None:
         """
         Close every shared memories.
         """
 
+        # The latest values are kept without any change so that the history of a removed visual object can still be
+        # recorded
+        self.__data = {field_name: data.copy() for field_name, data in self.__data.items()}
+        self.__dirty = {field_name: array(False, dtype=bool) for field_name in self.__dirty.keys()}
+
         # Close each data/dirty shared memory pair
-        for buffers in self.__buffers.values():
-            buffers[0].close()
-            buffers[1].close()
+        for field_name, buffers in self.__buffers.items():
+            _detach(sm_name=self.__names[field_name], buffers=buffers)
+        self.__buffers.clear()
+
+
+class Record:
+
+    def __init__(self, storage: Storage, fields: Dict[str, Dict[str, Any]], nb_frames: int):
+        """
+        This class loads the recorded history of each data field of a visual object (offline replay).
+
+        :param storage: Storage of the recording.
+        :param fields: Description of the history of each data field.
+        :param nb_frames: Number of recorded frames.
+        """
+
+        self.history: Dict[str, History] = {field_name: History(storage=storage,
+                                                                shape=field['shape'],
+                                                                dtype=field['dtype'],
+                                                                history_id=field['id'],
+                                                                chunk_len=field['chunk_len'])
+                                            for field_name, field in fields.items()}
+        self.nb_frames = nb_frames
+
+        # Each data field is considered as modified, the first frame being displayed
+        self.__dirty = {field_name: array(True) for field_name in fields.keys()}
+        self.versions: Dict[str, int] = self.get_versions(idx=0)
+
+    def get(self) -> Tuple[Dict[str, ndarray], Dict[str, ndarray]]:
+        """
+        Access the data fields of the first frame and the dirty flags.
+        """
+
+        return self.get_frame(idx=0), self.__dirty
+
+    def content_key(self, field_name: str) -> Optional[str]:
+        return None
+
+    def get_frame(self, idx: int) -> Dict[str, ndarray]:
+        """
+        Get the recorded value of each data field at a given frame.
+
+        :param idx: Index of the frame.
+        """
+
+        return {field_name: history.get(frame=idx) for field_name, history in self.history.items()}
+
+    def get_versions(self, idx: int) -> Dict[str, int]:
+        """
+        Get the version of each data field at a given frame.
+
+        :param idx: Index of the frame.
+        """
+
+        return {field_name: history.record(frame=idx) for field_name, history in self.history.items()}
+
+    def store(self, record: bool = True) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
@@ -1,4 +1,9 @@
+from typing import Optional
+from time import perf_counter
+from numpy import isfinite, searchsorted
+
 from SimRender.core.remote.viewer import Viewer
+from SimRender.core.remote.history import Storage
 
 
 PLAY_SYMBOL = "  \u23F5  "
@@ -9,19 +14,43 @@ FORWARD_SYMBOL = " \u29D0 "
 
 class Player(Viewer):
 
-    def __init__(self, socket_port: int, *args, **kwargs):
+    def __init__(self,
+                 socket_port: int,
+                 history_dir: Optional[str] = None,
+                 ram_budget: int = 512,
+                 replay: Optional[str] = None,
+                 speed: float = 1.,
+                 interpolate: bool = False,
+                 *args, **kwargs):
         """
         Viewer to render visual objects.
 
-        :param socket_port: Port number of the simulation socket.
+        :param socket_port: Port number of the simulation socket (unused in replay mode).
+        :param history_dir: Directory of the history files (a temporary directory is used by default).
+        :param ram_budget: Maximum size in MB of the history chunks loaded in RAM.
+        :param replay: Directory of a recording to replay instead of connecting to a simulation process.
+        :param speed: Playback speed factor of the replay, relative to the simulation time.
+        :param interpolate: If True, the positions are linearly interpolated between the recorded frames in replay.
         """
 
         # Init the Plotter as interactive
-        super().__init__(socket_port=socket_port, store_data=True, *args, **kwargs)
+        storage = Storage(directory=history_dir, ram_budget=ram_budget) if replay is None else None
+        super().__init__(socket_port=socket_port, storage=storage, replay=replay, *args, **kwargs)
 
         # Animation widgets
+        self.__replay = replay is not None
+        self.__speed = speed
+        self.__interpolate = interpolate
+        self.__clock = (0., 0.)
+
+        # Playback times of the recorded frames (the simulation time is used if available, the wall time otherwise)
+        if self.__replay:
+            times = self.factory.times
+            times = times[:, 0] if isfinite(times[:, 0]).all() else times[:, 1]
+            self.__times = times - times[0]
         self.__animate = True
         self.__id_frame = 0
+        self.__target_frame = 0
         self.btn_play = self.add_button(fnc=self._toggle,
                                         pos=[0.5, 0.05],
                                         font='Kanopus',
@@ -45,6 +74,59 @@ class Player(Viewer):
         self.remove_callback(cid=self.cid)
         self.cid = self.add_callback(event_name='timer', func=self.time_step, enable_picking=False)
 
+        # Replay mode: start paused on the first recorded frame
+        if self.__replay:
+            self._toggle(None, None)
+
+    def time_step(self, _) -> None:
+        """
+        Timer callback of the player.
+        """
+
+        if self.__animate:
+
+            # Live mode: render the simulation steps
+            if not self.__replay:
+                super().time_step(_)
+                return
+
+            # Replay mode: render the recorded frame at the current playback time, pause on the last one
+            self.__playback()
+            return
+
+        # Only the latest requested frame is rendered (intermediate frames of fast slider drags are skipped)
+        if self.__target_frame != self.__id_frame:
+            self.__id_frame = self.__target_frame
+            self._set_frame(idx=self.__id_frame)
+
+    def __playback(self) -> None:
+        """
+        Render the recorded frame at the current playback time.
+        """
+
+        # Playback time in the recording
+        times = self.__times
+        start_time, start_wall = self.__clock
+        t = start_time + (perf_counter() - start_wall) * self.__speed
+        if t >= times[-1]:
+            self.__target_frame = self.factory.nb_frames - 1
+            self.slider.value = self.__target_frame
+            self._toggle(None, None)
+            return
+
+        # Get the recorded frame and the interpolation factor towards the next one
+        idx = max(0, int(searchsorted(times, t, side='right')) - 1)
+        alpha = 0.
+        if self.__interpolate and times[idx + 1] > times[idx]:
+            alpha = (t - times[idx]) / (times[idx + 1] - times[idx])
+        self.__target_frame = idx
+        self.slider.value = idx
+
+        # An interpolated frame is not a recorded one, it must be replaced when the player is paused
+        self.factory.set_frame(idx=idx, alpha=alpha)
+        self.render()
+        self.__id_frame = idx if alpha == 0 else -1
+
     def _toggle(self, obj, evt):
 
         self.btn_play.switch()
@@ -55,45 +137,56 @@ class Player(Viewer):
         self.__animate = True
         if self.timer_id is not None:
             self.timer_callback(action='destroy', timer_id=self.timer_id)
-        self.timer_id = self.timer_callback(action='create', dt=1)
-        if self.slider is not None:
-            self.slider = None
-            self.sliders = []
+
+        # Replay mode: keep the slider and play the recorded frames from the current one (restart at the end)
+        if self.__replay:
+            if self.__target_frame >= self.factory.nb_frames - 1:
+                self.__target_frame = 0
+            self.__clock = (self.__times[self.__target_frame], perf_counter())
+            self.timer_id = self.timer_callback(action='create', dt=16)
+
+        # Live mode: remove the slider and go back to the simulation steps
+        else:
+            self.timer_id = self.timer_callback(action='create', dt=1)
+            if self.slider is not None:
+                self.slider.off()
+                self.slider = None
+                self.sliders = []
 
     def _pause(self):
 
         self.__animate = False
         if self.timer_id is not None:
             self.timer_callback(action='destroy', timer_id=self.timer_id)
-            self.timer_id = None
-            self.__id_frame = self.count
+        if not self.__replay:
+            self.__id_frame = self.__target_frame = self.factory.nb_frames - 1
+
+        # The seek requests are applied at a fixed rate while paused
+        self.timer_id = self.timer_callback(action='create', dt=16)
         if self.slider is None:
             self.slider = self.add_slider(sliderfunc=self._slider,
                                           pos=[[0.25, 0.06], [0.75, 0.06]],
                                           c='grey3',
                                           xmin=0,
-                                          xmax=self.__id_frame,
-                                          value=self.__id_frame,
+                                          xmax=max(1, self.factory.nb_frames - 1),
+                                          value=self.__target_frame,
                                           show_value=False)
 
     def _backward(self, obj, evt):
 
         if not self.__animate:
-            self.__id_frame = max(0, self.__id_frame - 1)
-            self._set_frame(idx=self.__id_frame)
-            self.slider.value = self.__id_frame
+            self.__target_frame = max(0, self.__target_frame - 1)
+            self.slider.value = self.__target_frame
 
     def _forward(self, obj, evt):
 
         if not self.__animate:
-            self.__id_frame = min(self.__id_frame + 1, self.count)
-            self._set_frame(idx=self.__id_frame)
-            self.slider.value = self.__id_frame
+            self.__target_frame = min(self.__target_frame + 1, self.factory.nb_frames - 1)
+            self.slider.value = self.__target_frame
 
     def _slider(self, obj, evt):
 
-        self.__id_frame = round(obj.value)
-        self._set_frame(idx=self.__id_frame)
+        self.__target_frame = round(obj.value)
 
     def _set_frame(self, idx: int):
 
@@ -105,4 +198,5 @@ if __name__ == '__main__':
 
     # Executed code when the visualization process is launched
     from sys import argv
-    Player(socket_port=int(argv[1])).launch()
+    from json import loads
+    Player(socket_port=int(argv[1]), **loads(argv[2])).launch()
@@ -0,0 +1,90 @@
+from typing import Any, Callable, Dict
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Lock
+
+
+class FramePrefetcher:
+
+    def __init__(self, prepare: Callable[[int], Any], window: int = 8):
+        """
+        This class prepares the data of the frames around the cursor of the player in a background thread, so that
+        stepping or playing through the history does not wait for the decoding of the frames.
+        The prepared frames are kept in a bounded cache (the furthest frames from the cursor are evicted first).
+
+        :param prepare: Function returning the prepared data of a frame.
+        :param window: Number of frames prepared ahead of the cursor, in the direction of travel.
+        """
+
+        self.__prepare = prepare
+        self.__window = max(1, window)
+        self.__cursor = 0
+        self.__direction = 1
+
+        # Cache of the prepared frames with format {frame: data}
+        self.__cache: Dict[int, Any] = {}
+        self.__pending: Dict[int, Future] = {}
+        self.__lock = Lock()
+
+        # Background thread to prepare the frames
+        self.__worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='SimRender_prefetch')
+
+    def get(self, idx: int, nb_frames: int, move: bool = True) -> Any:
+        """
+        Get the prepared data of a frame, then prepare the next frames in the direction of travel.
+
+        :param idx: Index of the frame.
+        :param nb_frames: Number of available frames.
+        :param move: If False, the cursor is not moved to this frame (no frames are prepared).
+        """
+
+        # Get the frame from the cache, wait for its preparation in the background thread or prepare it
+        with self.__lock:
+            data = self.__cache.get(idx)
+            future = self.__pending.get(idx)
+        if data is None:
+            data = future.result() if future is not None else self.__insert(idx=idx, data=self.__prepare(idx))
+        if not move:
+            return data
+
+        # Update the direction of travel
+        if idx != self.__cursor:
+            self.__direction = 1 if idx > self.__cursor else -1
+        self.__cursor = idx
+
+        # Cancel the preparation of the frames that are no longer ahead of the cursor
+        ahead = [idx + self.__direction * i for i in range(1, self.__window + 1)]
+        ahead = [i for i in ahead if 0 <= i < nb_frames]
+        with self.__lock:
+            for i in [i for i in self.__pending if i not in ahead]:
+                if self.__pending[i].cancel():
+                    del self.__pending[i]
+
+            # Prepare the frames ahead of the cursor
+            for i in ahead:
+                if i not in self.__cache and i not in self.__pending:
+                    self.__pending[i] = self.__worker.submit(lambda f=i: self.__insert(idx=f, data=self.__prepare(f)))
+        return data
+
+    def __insert(self, idx: int, data: Any) -> Any:
+        """
+        Add a prepared frame in the cache, then evict the furthest frames from the cursor if the cache is full.
+
+        :param idx: Index of the frame.
+        :param data: Prepared data of the frame.
+        """
+
+        with self.__lock:
+            self.__pending.pop(idx, None)
+            self.__cache[idx] = data
+            while len(self.__cache) > 2 * self.__window + 1:
+                del self.__cache[max(self.__cache, key=lambda i: abs(i - self.__cursor))]
+        return data
+
+    def close(self) -> None:
+        """
+        Stop the background thread and release the cache.
+        """
+
+        self.__worker.shutdown(wait=True, cancel_futures=True)
+        with self.__lock:
+            self.__cache.clear()
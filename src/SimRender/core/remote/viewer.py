@@ -1,43 +1,94 @@
+from typing import Optional, List
+from os import environ
+from sys import platform
+from time import sleep
+from numpy import ndarray, flip, ascontiguousarray
 from vedo import Plotter, get_color
+from vtkmodules.vtkCommonCore import vtkUnsignedCharArray
+from vtkmodules.util.numpy_support import vtk_to_numpy
 
-from SimRender.core.remote.factory import Factory
+from SimRender.core.remote.factory import Factory, ReplayFactory
+from SimRender.core.remote.history import Storage
+from SimRender.core.remote.writer import FrameWriter
 
 
 class Viewer(Plotter):
 
-    def __init__(self, socket_port: int, store_data: bool = False, *args, **kwargs):
+    def __init__(self,
+                 socket_port: int,
+                 storage: Optional[Storage] = None,
+                 offscreen: bool = False,
+                 output: Optional[str] = None,
+                 stride: int = 1,
+                 replay: Optional[str] = None,
+                 record_objects: Optional[List[int]] = None,
+                 record_fields: Optional[List[str]] = None,
+                 *args, **kwargs):
         """
         Viewer to render visual objects.
 
-        :param socket_port: Port number of the simulation socket.
+        :param socket_port: Port number of the simulation socket (unused in replay mode).
+        :param storage: If defined, the history of the visual objects is recorded in this storage.
+        :param offscreen: If True, the rendering is performed without any window (headless mode).
+        :param output: Path to a directory (PNG sequence) or to a video file to write the rendered frames.
+        :param stride: Number of simulation steps between two written frames.
+        :param replay: Directory of a recording to replay instead of connecting to a simulation process.
+        :param record_objects: Indices of the visual objects whose changes are recorded in the storage (all by default).
+        :param record_fields: Data fields whose changes are recorded in the storage (all by default).
         """
 
+        # Headless mode: use the software OpenGL implementation of VTK (can be overridden by the environment)
+        if offscreen and platform.startswith('linux'):
+            environ.setdefault('VTK_DEFAULT_OPENGL_WINDOW', 'vtkOSOpenGLRenderWindow')
+
         # Init the Plotter as interactive
-        super().__init__(interactive=True, *args, **kwargs)
+        super().__init__(interactive=not offscreen, offscreen=offscreen, *args, **kwargs)
 
-        # Create a Factory to recover the visual objects from the simulation process
-        self.factory = Factory(socket_port=socket_port, plotter=self, store_data=store_data)
+        # Create a Factory to recover the visual objects from the simulation process or from a recording
+        if replay is None:
+            self.factory = Factory(socket_port=socket_port, plotter=self, storage=storage,
+                                   record_objects=record_objects, record_fields=record_fields)
+        else:
+            self.factory = ReplayFactory(record_dir=replay, plotter=self)
 
         # Add visual objects from the factory
         self.add(self.factory.vedo_objects)
 
+        # Create the frame writer
+        self.writer = FrameWriter(output=output, stride=stride) if output is not None else None
+
         # Create the background switch callback
-        self.add_callback(event_name='keypress', func=self.switch_background)
         self.bg_colors = ['w', 'k']
         self.bg_id = 0
-
-        # Timer callback
-        self.initialize_interactor()  # needed for windows
-        self.cid = self.add_callback(event_name='timer', func=self.time_step, enable_picking=True)
-        self.timer_id = self.timer_callback(action='create', dt=1)
         self.count = 0
 
+        # Timer callback (no interactor in headless mode)
+        if not offscreen:
+            self.add_callback(event_name='keypress', func=self.switch_background)
+            self.initialize_interactor()  # needed for windows
+            self.cid = self.add_callback(event_name='timer', func=self.time_step, enable_picking=True)
+            self.timer_id = self.timer_callback(action='create', dt=1)
+
     def launch(self):
 
         # Launch the visualization window
         self.factory.listen()
-        self.show(axes=4).close()
-        self.factory.close()
+        if not self.offscreen:
+            self.show(axes=4).close()
+            self.factory.close()
+
+        # Headless mode: the rendering loop is driven by the simulation step counter
+        else:
+            self.show(axes=4, interactive=False)
+            while self.factory.is_open:
+                self.time_step(None)
+                sleep(1e-4)
+            if self.writer is not None:
+                self.writer.close()
+
+            # The listening thread of the factory closes the communication once the plotter is closed
+            self._must_close_now = True
+            self.close()
 
     def time_step(self, _) -> None:
         """
@@ -47,6 +98,9 @@ class Viewer(Plotter):
         # Check the number of rendered steps
         if self.count < self.factory.count:
 
+            # Check the capture request before updating so that the captured images include the latest data
+            capture = self.factory.capture_requested
+
             # Update the viewer counter
             self.count = self.factory.count
 
@@ -54,6 +108,26 @@ class Viewer(Plotter):
             self.factory.update()
             self.render()
 
+            # Read back the render window for the simulation process
+            if capture:
+                self.factory.capture()
+
+            # Send the rendered frame to the writer
+            if self.writer is not None:
+                self.writer.write(step=self.count, frame=self.grab())
+
+    def grab(self) -> ndarray:
+        """
+        Read back the RGB image of the render window.
+        """
+
+        width, height = self.window.GetSize()
+        pixels = vtkUnsignedCharArray()
+        self.window.GetPixelData(0, 0, width - 1, height - 1, 0, pixels)
+
+        # VTK images start from the bottom-left corner
+        return ascontiguousarray(flip(vtk_to_numpy(pixels).reshape(height, width, 3), axis=0))
+
     def switch_background(self, evt) -> None:
         """
         Keyboard callback of the viewer.
@@ -74,4 +148,5 @@ if __name__ == '__main__':
 
     # Executed code when the visualization process is launched
     from sys import argv
-    Viewer(socket_port=int(argv[1])).launch()
+    from json import loads
+    Viewer(socket_port=int(argv[1]), **loads(argv[2])).launch()
@@ -1,15 +1,42 @@
 from typing import List, Optional
 import sys
+from time import perf_counter
+from json import loads
+from socket import socket, AF_INET, SOCK_STREAM, SOMAXCONN
+from threading import Thread
+from queue import Queue
 from PySide6.QtWidgets import QWidget, QApplication, QMainWindow, QFrame, QVBoxLayout, QComboBox
 from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 from vedo import Plotter
 
 from SimRender.core.remote.factory import Factory
+from SimRender.core.remote.ensemble import Ensemble
 
 
 class ViewerBatch(QMainWindow):
 
-    def __init__(self, socket_ports: List[int], parent: Optional[QWidget] = None):
+    def __init__(self,
+                 nb_view: int,
+                 socket_port: int,
+                 grid: bool = False,
+                 link_cameras: bool = False,
+                 fps: float = 30.,
+                 inactive_fps: float = 5.,
+                 ensemble: Optional[str] = None,
+                 parent: Optional[QWidget] = None):
+        """
+        Viewer to render visual objects from several simulation sources.
+
+        :param nb_view: Number of simulation sources.
+        :param socket_port: Port number of the local batch socket, used to share the port of the batch endpoint.
+        :param grid: If True, the simulations are rendered side by side in a grid of viewports. Otherwise, a single
+                     simulation is rendered at a time.
+        :param link_cameras: If True, the viewports of the grid share the same camera.
+        :param fps: Maximum refresh rate of the active simulation.
+        :param inactive_fps: Maximum refresh rate of the other simulations (in the grid or hidden in the tab menu).
+        :param ensemble: If defined, the statistics of the batch are rendered in an additional view, colored by this
+                         statistic ('spread', 'mean', 'std', 'min' or 'max', see Ensemble).
+        """
 
         # Init the Qt window
         super().__init__(parent=parent)
@@ -17,39 +44,108 @@ class ViewerBatch(QMainWindow):
         self.layout = QVBoxLayout()
         self.vtk_widget = QVTKRenderWindowInteractor(parent=self.frame)
 
-        # Create the Vedo Plotter
-        self.plt = Plotter(interactive=True, qt_widget=self.vtk_widget)
-
-        # Init the Factories
-        self.factories: List[Factory] = []
-        for socket_port in socket_ports:
-            self.factories.append(Factory(socket_port=socket_port, plotter=self.plt))
-            self.factories[-1].listen()
-        self.active_factory = self.factories[0]
-        if len(self.factories) > 1:
-            for factory in self.factories[1:]:
-                factory.active = False
-
-        # Create source selection combobox
+        # Create the Vedo Plotter (with a renderer per simulation in grid mode)
+        self.grid = grid
+        nb_renderers = nb_view + (ensemble is not None) if grid else 1
+        self.plt = Plotter(N=nb_renderers, sharecam=link_cameras, interactive=True,
+                           qt_widget=self.vtk_widget)
+
+        # The Factories are created as the simulations get connected, in any order
+        self.factories: List[Optional[Factory]] = [None] * nb_view
+        self.active = 0
+        self.__connected: Queue = Queue()
+
+        # Create the ensemble view (rendered in the last viewport in grid mode or selected in the tab menu)
+        self.ensemble = None if ensemble is None else Ensemble(factories=self.factories, plotter=self.plt,
+                                                               statistic=ensemble, at=nb_view if grid else 0)
+        if self.ensemble is not None and not grid:
+            self.ensemble.visible = False
+
+        # Create the single endpoint of the batch, then share its port with the local batch
+        self.__server = socket(AF_INET, SOCK_STREAM)
+        self.__server.bind(('localhost', 0))
+        self.__server.listen(max(nb_view, SOMAXCONN))
+        with socket(AF_INET, SOCK_STREAM) as local:
+            local.connect(('localhost', socket_port))
+            local.send(self.__server.getsockname()[1].to_bytes(length=2, byteorder='big'))
+        Thread(target=self.__accept, daemon=True).start()
+
+        # Create source selection combobox (selects the active viewport in grid mode)
         source_cbox = QComboBox(parent=self.frame)
-        source_cbox.addItems([f'Simulation n°{i + 1}' for i in range(len(self.factories))])
+        source_cbox.addItems([f'Simulation n°{i + 1}' for i in range(nb_view)])
+        if self.ensemble is not None:
+            source_cbox.addItem('Ensemble')
         source_cbox.currentIndexChanged.connect(self.select_cbox_source)
+        self.source_cbox = source_cbox
 
-        # Add visual objects from the factory
-        self.plt.add(self.active_factory.vedo_objects)
+        # Refresh rates of the simulations: the steps exceeding the rate budget of a simulation are skipped
+        self.periods = (1 / fps, 1 / inactive_fps)
+        self.counts = [0] * nb_view
+        self.updates = [0.] * nb_view
 
-        # Timer callback
+        # Timer callback (the viewport under a click becomes the active one in grid mode)
         self.plt.add_callback(event_name='timer', func=self.time_step, enable_picking=True)
+        if grid:
+            self.plt.add_callback(event_name='LeftButtonPress', func=self.select_viewport)
         self.timer_id = self.plt.timer_callback(action='create', dt=1)
-        self.count = 0
 
-        self.plt.show(axes=4)
+        for i in range(nb_renderers):
+            self.plt.show(axes=4, at=i)
         self.layout.addWidget(self.vtk_widget)
         self.layout.addWidget(source_cbox)
         self.frame.setLayout(self.layout)
         self.setCentralWidget(self.frame)
         self.show()
 
+    @property
+    def active_factory(self) -> Optional[Factory]:
+        """
+        Get the Factory of the active simulation (None if not connected yet).
+        """
+
+        return self.factories[self.active] if self.active < len(self.factories) else None
+
+    def __accept(self) -> None:
+        """
+        Accepting thread of the batch endpoint.
+        """
+
+        # Each connection is initialized in its own thread so that the simulations are attached concurrently
+        for _ in range(len(self.factories)):
+            remote, _ = self.__server.accept()
+            Thread(target=self.__attach, args=(remote,), daemon=True).start()
+        self.__server.close()
+
+    def __attach(self, remote: socket) -> None:
+        """
+        Receive the key of a simulation and the information about its shared data.
+
+        :param remote: Socket connected to the simulation process.
+        """
+
+        key = int.from_bytes(bytes=remote.recv(2), byteorder='big')
+        factory = Factory(socket_port=None, plotter=self.plt, at=key if self.grid else 0, remote=remote)
+
+        # The visual objects are added to the Plotter in the rendering thread
+        self.__connected.put((key, factory))
+
+    def __add_factories(self) -> None:
+        """
+        Add the visual objects of the newly connected simulations.
+        """
+
+        while not self.__connected.empty():
+            key, factory = self.__connected.get()
+            self.factories[key] = factory
+
+            # The visual objects of every simulation are kept in the Plotter, the hidden ones are still refreshed at a
+            # low rate so that switching between the simulations is instant
+            self.plt.add(factory.vedo_objects, at=key if self.grid else 0)
+            factory.active = self.grid or key == self.active
+            if factory.active:
+                self.plt.renderers[key if self.grid else 0].ResetCamera()
+            factory.listen()
+
     def select_cbox_source(self, idx: int) -> None:
         """
         Signal connected to the QCombobox to change the simulation source.
@@ -57,28 +153,87 @@ class ViewerBatch(QMainWindow):
         :param idx: Index of the item selected in the QCombobox.
         """
 
-        if self.factories[idx] != self.active_factory:
-            self.plt.remove(self.active_factory.vedo_objects)
-            self.active_factory = self.factories[idx]
-            self.plt.add(self.active_factory.vedo_objects)
+        if idx != self.active:
+
+            # Grid mode: the selected simulation is refreshed at the full rate
+            if self.grid:
+                self.active = idx
+                return
+
+            # Toggle the visibility of the simulations
+            if self.active_factory is not None:
+                self.active_factory.active = False
+            self.active = idx
+            if self.active_factory is not None:
+                self.active_factory.active = True
+
+            # The ensemble view replaces the simulations out of grid mode
+            if self.ensemble is not None:
+                self.ensemble.visible = idx == len(self.factories)
             self.plt.render()
 
+    def select_viewport(self, evt) -> None:
+        """
+        Mouse callback of the grid to select the active simulation.
+
+        :param evt: Event dictionary.
+        """
+
+        if evt.at is not None and 0 <= evt.at < len(self.factories):
+            self.source_cbox.setCurrentIndex(evt.at)
+
     def time_step(self, _) -> None:
         """
         Timer callback of the viewer.
         """
 
-        # Check the number of rendered steps
-        if self.count < self.active_factory.count:
-
-            # Update the viewer counter
-            self.count = self.active_factory.count
+        # Add the newly connected simulations
+        if not self.__connected.empty():
+            self.__add_factories()
+            self.plt.render()
 
-            # Update the visuals objects
-            self.active_factory.update()
+        now = perf_counter()
+        updated = False
+        for i, factory in enumerate(self.factories):
+
+            if factory is None or factory.detached:
+                continue
+
+            # Apply the last step of a stopped simulation, then release its process without waiting for the window to
+            # be closed (its visual objects keep their last state)
+            if not factory.is_open:
+                if self.counts[i] < factory.count:
+                    self.counts[i] = factory.count
+                    factory.update()
+                    updated = updated or factory.active
+                factory.detach()
+                continue
+
+            # Check the number of rendered steps and the refresh rate budget of the simulation (the visible
+            # synchronized simulations are waiting for the rendering, each of their steps is rendered)
+            period = 0 if factory.synchronized and factory.active else \
+                self.periods[0] if i == self.active else self.periods[1]
+            if self.counts[i] < factory.count and now - self.updates[i] >= period:
+
+                # Update the viewer counter
+                self.counts[i] = factory.count
+                self.updates[i] = now
+
+                # Update the visuals objects (the hidden simulations do not require a rendering)
+                factory.update()
+                updated = updated or factory.active
+
+        # Update the ensemble view with the statistics computed in the background
+        if self.ensemble is not None and self.ensemble.update():
+            updated = True
+
+        # Render the window once for all the updated viewports
+        if updated:
             self.plt.render()
 
     def on_close_event(self):
+        if self.ensemble is not None:
+            self.ensemble.close()
         self.vtk_widget.close()
 
 
@@ -87,8 +242,7 @@ if __name__ == '__main__':
     app = QApplication([])
 
     # Executed code when the visualization process is launched
-    batch_socket_ports = [int(port) for port in sys.argv[1].split(' ')]
-    win = ViewerBatch(socket_ports=batch_socket_ports)
+    win = ViewerBatch(nb_view=int(sys.argv[1]), socket_port=int(sys.argv[2]), **loads(sys.argv[3]))
     win.showMaximized()
 
     app.aboutToQuit.connect(win.on_close_event)
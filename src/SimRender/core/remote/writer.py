@@ -0,0 +1,96 @@
+from typing import Optional
+from queue import Queue
+from threading import Thread
+from subprocess import Popen, PIPE, DEVNULL
+from shutil import which
+from os import makedirs
+from os.path import join, splitext
+from numpy import ndarray
+from vedo import Image
+
+
+VIDEO_FORMATS = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
+
+
+class FrameWriter:
+
+    def __init__(self, output: str, stride: int = 1, fps: int = 30):
+        """
+        This class encodes the rendered frames on disk in a background thread, either as a PNG sequence or as a video.
+
+        :param output: Path to a directory (PNG sequence) or to a video file (mp4, avi, mov, mkv, webm).
+        :param stride: Number of simulation steps between two written frames.
+        :param fps: Frame rate of the video file.
+        """
+
+        self.__stride = max(1, stride)
+        self.__fps = fps
+        self.__last_step: Optional[int] = None
+        self.__nb_frames = 0
+
+        # Video files are encoded with ffmpeg, otherwise frames are written as a PNG sequence
+        self.__video: Optional[Popen] = None
+        self.__output = output
+        self.__is_video = splitext(output)[1].lower() in VIDEO_FORMATS
+        if self.__is_video and which('ffmpeg') is None:
+            self.__output = splitext(output)[0]
+            self.__is_video = False
+            print(f'Warning: ffmpeg was not found, frames will be written as a PNG sequence in {self.__output}')
+        if not self.__is_video:
+            makedirs(self.__output, exist_ok=True)
+
+        # Bounded queue so that the rendering loop cannot accumulate an unlimited number of frames in memory
+        self.__queue: Queue = Queue(maxsize=64)
+        self.__thread = Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def write(self, step: int, frame: ndarray) -> None:
+        """
+        Add a rendered frame to the encoding queue if the stride is respected.
+
+        :param step: Simulation step of the frame.
+        :param frame: RGB image with shape (height, width, 3).
+        """
+
+        if self.__last_step is None or step - self.__last_step >= self.__stride:
+            self.__last_step = step
+            self.__queue.put(frame)
+
+    def __run(self) -> None:
+        """
+        Encoding thread of the writer.
+        """
+
+        while (frame := self.__queue.get()) is not None:
+            if self.__is_video:
+                self.__encode_video(frame=frame)
+            else:
+                Image(frame).write(join(self.__output, f'frame_{self.__nb_frames:06d}.png'))
+            self.__nb_frames += 1
+
+    def __encode_video(self, frame: ndarray) -> None:
+        """
+        Send a frame to the ffmpeg process (created with the size of the first frame).
+
+        :param frame: RGB image with shape (height, width, 3).
+        """
+
+        if self.__video is None:
+            height, width = frame.shape[:2]
+            self.__video = Popen(['ffmpeg', '-y', '-loglevel', 'error',
+                                  '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+                                  '-r', str(self.__fps), '-i', '-',
+                                  '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', self.__output],
+                                 stdin=PIPE, stdout=DEVNULL)
+        self.__video.stdin.write(frame.tobytes())
+
+    def close(self) -> None:
+        """
+        Encode the remaining frames and close the output.
+        """
+
+        self.__queue.put(None)
+        self.__thread.join()
+        if self.__video is not None:
+            self.__video.stdin.close()
+            self.__video.wait()
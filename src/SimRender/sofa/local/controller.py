@@ -0,0 +1,68 @@
+from typing import Optional, Callable
+from time import time
+from math import floor
+import Sofa
+
+
+class RenderController(Sofa.Core.Controller):
+
+    def __init__(self,
+                 root_node: Sofa.Core.Node,
+                 render: Callable[[], None],
+                 steps: int = 1,
+                 max_fps: Optional[float] = None,
+                 period: Optional[float] = None,
+                 *args, **kwargs):
+        """
+        This SOFA controller triggers the rendering at the end of the animation steps, once the mappings (including the
+        visual ones) are updated with the new positions. The rendered steps are throttled so that the visualization
+        overhead remains bounded when the simulation runs faster than real time (the enabled policies are combined).
+
+        :param root_node: Root node of the SOFA scene graph.
+        :param render: Rendering function to call.
+        :param steps: Number of simulation steps between two rendered steps.
+        :param max_fps: If defined, maximum number of rendered steps per second (wall time).
+        :param period: If defined, simulation time between two rendered steps.
+        """
+
+        Sofa.Core.Controller.__init__(self, name='SimRenderController', *args, **kwargs)
+
+        self.__root_node = root_node
+        self.__render = render
+
+        # Throttling policies
+        self.__steps = max(1, steps)
+        self.__min_delay = 0. if max_fps is None else 1 / max_fps
+        self.__period = period
+
+        # Status of the previous rendered step
+        self.__counter = 0
+        self.__last_render = -float('inf')
+        self.__bucket: Optional[int] = None
+
+    def onUpdateMappingEndEvent(self, event) -> None:
+        """
+        Render the current step if it satisfies the throttling policies (the AnimateEndEvent is sent before the update
+        of the mappings, the visual models would then be rendered with the positions of the previous step).
+        """
+
+        # Every steps
+        self.__counter += 1
+        if self.__counter % self.__steps != 0:
+            return
+
+        # Every period of simulation time
+        if self.__period is not None:
+            bucket = floor(self.__root_node.time.value / self.__period + 1e-6)
+            if bucket == self.__bucket:
+                return
+
+        # At most max_fps per second
+        now = time()
+        if now - self.__last_render < self.__min_delay:
+            return
+
+        if self.__period is not None:
+            self.__bucket = bucket
+        self.__last_render = now
+        self.__render()
@@ -1,34 +1,140 @@
-from typing import List, Union, Dict, Optional, Callable
+from typing import List, Union, Dict, Optional, Callable, Tuple, Any
+from time import perf_counter
 import Sofa
 from numpy import array, ndarray, nan, tile
 
 from SimRender.core.local.factory import Factory as _Factory, Objects as _Objects
+from SimRender.core.local.memory import Memory
 from SimRender.sofa.local.scene_graph import SceneGraph
 from SimRender.sofa.local.sofa_objects import collection, Object
 
 
 class Factory(_Factory):
 
-    def __init__(self, root_node: Sofa.Core.Node, sync: bool):
+    def __init__(self,
+                 root_node: Sofa.Core.Node,
+                 sync: bool,
+                 capture_size: Optional[Tuple[int, int]] = None,
+                 batch_lag: int = 0):
         """
         This class is used to create and update the visualization data in shared memories.
 
         :param root_node: Root node of the SOFA scene graph
         :param sync: If True, the update call is synchronized with the end of the remote rendering step.
+        :param capture_size: If defined, size (width, height) of the shared image buffers used to capture the
+                             rendered images.
+        :param batch_lag: Maximum number of steps between the simulation and the rendering with sync in batch mode.
         """
 
-        super().__init__(sync=sync)
+        super().__init__(sync=sync, capture_size=capture_size, batch_lag=batch_lag)
 
         self.objects = Objects(root_node=root_node, factory=self)
-        self.callbacks: Dict[int, Object] = {}
+        self.__root_node = root_node
 
-    def update(self) -> None:
+        # Dispatch table of the data wrapper callbacks with format {object_id: callback}
+        self.callbacks: Dict[int, Callback] = {}
 
-        for idx, data_wrapper in self.callbacks.items():
-            func = self.objects.__getattribute__(f'update_{data_wrapper.object_type}')
-            func(idx, **data_wrapper.update())
+    def register(self, object_id: int, data_wrapper: Object) -> None:
+        """
+        Add the data wrapper callback of a visual object. The callback is resolved once in the dispatch table: it then
+        directly writes in the shared memories of the visual object at each update.
+
+        :param object_id: ID of the visual object.
+        :param data_wrapper: Data wrapper of the SOFA Data fields.
+        """
+
+        memory = self.memories[object_id]
+        if data_wrapper.object_type != memory.object_type:
+            raise ValueError(f"The object with ID={object_id} is type '{memory.object_type}', it cannot be updated "
+                             f"with a '{data_wrapper.object_type}' data wrapper.")
+        self.callbacks[object_id] = Callback(data_wrapper=data_wrapper, memory=memory)
+
+    def unregister(self, object_id: int) -> None:
+        """
+        Remove the data wrapper callback of a visual object.
+
+        :param object_id: ID of the visual object.
+        """
+
+        self.callbacks.pop(object_id, None)
+
+    @property
+    def timings(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Get the time spent in each callback with format {object_id: {'name': name, 'calls': number of calls, 'time':
+        total time in seconds}}.
+        """
+
+        return {object_id: {'name': callback.name, 'calls': callback.calls, 'time': callback.time}
+                for object_id, callback in self.callbacks.items()}
+
+    def update(self, time: Optional[float] = None) -> None:
+
+        # Create or remove the visual objects of the components added or removed at runtime
+        self.objects.sync_scene_graph()
+
+        # Call each callback of the dispatch table
+        for callback in self.callbacks.values():
+            start = perf_counter()
+            callback()
+            callback.time += perf_counter() - start
+            callback.calls += 1
+
+        # The simulation time is read from the root node by default
+        super().update(time=self.__root_node.time.value if time is None else time)
 
-        super().update()
+
+class Callback:
+
+    def __init__(self, data_wrapper: Object, memory: Memory):
+        """
+        Data wrapper callback of a visual object, resolved once so that it directly updates the shared memories of the
+        visual object.
+
+        :param data_wrapper: Data wrapper of the SOFA Data fields.
+        :param memory: Shared memories of the visual object.
+        """
+
+        self.name = type(data_wrapper).__name__
+        self.__update = data_wrapper.update
+        self.__write = memory.update
+        self.__dynamic = data_wrapper.dynamic
+
+        # Tracked SOFA Data fields with format [(field_name, [data])], and their modification counters
+        self.__tracked: List[Tuple[str, List[Sofa.Core.Data]]] = list(data_wrapper.tracked.items())
+        self.__counters: List[Optional[List[int]]] = [None] * len(self.__tracked)
+
+        # Number of calls and total time spent in the callback
+        self.calls = 0
+        self.time = 0.
+
+    def __call__(self) -> None:
+        """
+        Update the shared memories of the visual object with the SOFA Data fields.
+        """
+
+        # Check the modification counters of the SOFA Data fields read by the callback (the dirty Data fields, such as
+        # engine outputs, are not evaluated yet and are considered as modified)
+        unchanged, changed = [], []
+        for i, (field_name, data) in enumerate(self.__tracked):
+            counter = [-1 if d.isDirty() else d.getCounter() for d in data]
+            if -1 not in counter and counter == self.__counters[i]:
+                unchanged.append(field_name)
+            else:
+                changed.append(field_name)
+            self.__counters[i] = counter
+
+        # Static objects: only reset the dirty flags of the shared memories
+        if not self.__dynamic and len(unchanged) == len(self.__tracked):
+            self.__write(data={})
+            return
+
+        # Unchanged data fields are not read nor compared, modified ones are directly copied in the shared memories
+        data = self.__update()
+        for field_name in unchanged:
+            if field_name in data:
+                data[field_name] = None
+        self.__write(data=data, changed=changed)
 
 
 class Objects(_Objects):
@@ -46,6 +152,17 @@ class Objects(_Objects):
         self.__scene_graph = SceneGraph(root_node=root_node)
         self.__SOFA_OBJECTS = collection()
 
+        # Visual objects created from the scene graph with format {(component_path, id(component)): object_id}, and
+        # class names of the components displayed when they are added at runtime (None if the changes are not tracked)
+        self.__scene_objects: Dict[Tuple[str, int], int] = {}
+        self.__class_names: Optional[List[str]] = None
+
+    def remove(self, object_id: int) -> None:
+
+        # The data wrapper callback is removed with the visual object
+        self.__factory.unregister(object_id=object_id)
+        super().remove(object_id=object_id)
+
     def add_sofa_mesh(self,
                       positions_data: Sofa.Core.Data,
                       cells_data: Union[Sofa.Core.Data, List[Sofa.Core.Data]],
@@ -73,7 +190,7 @@ class Objects(_Objects):
         """
 
         # Positions data
-        positions = positions_data.array().copy()
+        positions = positions_data.array()
         if len(positions) == 0:
             raise ValueError(f"Data contains an empty positions array.")
 
@@ -88,13 +205,16 @@ class Objects(_Objects):
 
         class DataWrapper:
             object_type: str = 'mesh'
+            tracked = {'positions': [positions_data]}
+            dynamic = colormap_function is not None
 
             def update(self):
-                return {'positions': positions_data.array().copy(),
+                # The SOFA Data buffers are directly copied in the shared memories
+                return {'positions': positions_data.array(),
                         'colormap_field': None if colormap_function is None else colormap_function()}
 
         # Create the mesh and add the data wrapper callback
-        idx = self.add_mesh(positions=positions_data.array().copy(),
+        idx = self.add_mesh(positions=positions,
                             cells=cells,
                             color=color,
                             alpha=alpha,
@@ -103,7 +223,7 @@ class Objects(_Objects):
                             colormap=colormap,
                             colormap_range=colormap_range,
                             colormap_field=colormap_function() if colormap_function is not None else array(nan))
-        self.__factory.callbacks[idx] = DataWrapper()
+        self.__factory.register(object_id=idx, data_wrapper=DataWrapper())
 
         return idx
 
@@ -130,26 +250,29 @@ class Objects(_Objects):
         """
 
         # Positions data
-        positions = positions_data.array().copy()
+        positions = positions_data.array()
         if len(positions) == 0:
             raise ValueError(f"Data contains an empty positions array.")
 
         class DataWrapper:
             object_type: str = 'points'
+            tracked = {'positions': [positions_data]}
+            dynamic = colormap_function is not None
 
             def update(self):
-                return {'positions': positions_data.array().copy(),
+                # The SOFA Data buffers are directly copied in the shared memories
+                return {'positions': positions_data.array(),
                         'colormap_field': None if colormap_function is None else colormap_function()}
 
         # Create the points and add the data wrapper callback
-        idx = self.add_points(positions=positions_data.array().copy(),
+        idx = self.add_points(positions=positions,
                               color=color,
                               alpha=alpha,
                               point_size=point_size,
                               colormap=colormap,
                               colormap_range=colormap_range,
                               colormap_field=colormap_function() if colormap_function is not None else array(nan))
-        self.__factory.callbacks[idx] = DataWrapper()
+        self.__factory.register(object_id=idx, data_wrapper=DataWrapper())
 
         return idx
 
@@ -176,7 +299,7 @@ class Objects(_Objects):
         """
 
         # Positions data
-        positions = positions_data.array().copy()
+        positions = positions_data.array()
         if len(positions) == 0:
             raise ValueError(f"Data contains an empty positions array.")
 
@@ -189,21 +312,24 @@ class Objects(_Objects):
 
         class DataWrapper:
             object_type: str = 'arrows'
+            tracked = {'positions': [positions_data], 'vectors': [vectors_data]}
+            dynamic = colormap_function is not None
 
             def update(self):
-                return {'positions': positions_data.array().copy(),
-                        'vectors': vectors_data.array().copy(),
+                # The SOFA Data buffers are directly copied in the shared memories
+                return {'positions': positions_data.array(),
+                        'vectors': vectors_data.array(),
                         'colormap_field': None if colormap_function is None else colormap_function()}
 
         # Create the arrows and add the data wrapper callback
-        idx = self.add_arrows(positions=positions_data.array().copy(),
+        idx = self.add_arrows(positions=positions,
                               vectors=vectors,
                               color=color,
                               alpha=alpha,
                               colormap=colormap,
                               colormap_range=colormap_range,
                               colormap_field=colormap_function() if colormap_function is not None else array(nan))
-        self.__factory.callbacks[idx] = DataWrapper()
+        self.__factory.register(object_id=idx, data_wrapper=DataWrapper())
 
         return idx
 
@@ -219,22 +345,32 @@ class Objects(_Objects):
         # Check if the component is implemented
         object_class = sofa_object.getClassName()
         if object_class in self.__SOFA_OBJECTS:
-
-            data_wrapper = self.__SOFA_OBJECTS[object_class](sofa_object=sofa_object)
-            func = self.__getattribute__(f'add_{data_wrapper.object_type}')
-            idx = func(**data_wrapper.create())
-            self.__factory.callbacks[idx] = data_wrapper
-            return idx
+            return self.__create(sofa_object=sofa_object)
 
         else:
             print(f"WARNING: Could not create a 3D object for this component as the class representation is not"
                   f"implemented. Available components are {self.__SOFA_OBJECTS.keys()}.")
 
+    def __create(self, sofa_object: Sofa.Core.Object) -> int:
+        """
+        Create the visual object of a SOFA component and add the data wrapper callback.
+
+        :param sofa_object: SOFA Object to render in the viewer.
+        :return: ID of the object in the viewer.
+        """
+
+        data_wrapper = self.__SOFA_OBJECTS[sofa_object.getClassName()](sofa_object=sofa_object)
+        func = self.__getattribute__(f'add_{data_wrapper.object_type}')
+        idx = func(**data_wrapper.create())
+        self.__factory.register(object_id=idx, data_wrapper=data_wrapper)
+        return idx
+
     def add_scene_graph(self,
                         visual_models: bool = True,
                         behavior_models: bool = False,
                         force_fields: bool = False,
-                        collision_models: bool = False) -> None:
+                        collision_models: bool = False,
+                        track_changes: bool = False) -> None:
         """
         The whole SOFA scene graph is explored to create visual objects automatically.
 
@@ -242,26 +378,44 @@ class Objects(_Objects):
         :param behavior_models: If True, display each detected behavior model in the scene graph.
         :param force_fields: If True, display each detected force field in the scene graph.
         :param collision_models: If True, display each detected collision model in the scene graph.
+        :param track_changes: If True, the nodes and components added or removed at runtime are detected at each
+                              update, their visual objects are then created or removed (the structure of each node is
+                              checked at each update, which is an overhead for the scenes with a fixed structure).
         """
 
         display_models = {'visual_model': visual_models, 'behavior_model': behavior_models,
                           'force_field': force_fields, 'collision_model': collision_models}
 
-        # Process each sofa object in the scene graph
-        for key, sofa_object in self.__scene_graph.graph.items():
+        # Handle the VisualStyle object
+        for _, sofa_object in self.__scene_graph.find(class_names=['VisualStyle']):
+            display_flags = sofa_object.displayFlags.value.split('  ')
+            # TODO: apply the display flags
+
+        # Process the sofa objects of the displayed categories for which a configuration exists (in the scene graph
+        # order), using the class index of the scene graph
+        class_names = [class_name for class_name, sofa_class in self.__SOFA_OBJECTS.items()
+                       if display_models[sofa_class.display_model]]
+        for path, sofa_object in self.__scene_graph.find(class_names=class_names):
+            self.__scene_objects[(path, id(sofa_object))] = self.__create(sofa_object=sofa_object)
+        if track_changes:
+            self.__class_names = class_names
+
+    def sync_scene_graph(self) -> None:
+        """
+        Detect the nodes and components added or removed in the scene graph since the previous call, then create or
+        remove the corresponding visual objects (only the visual objects created with add_scene_graph are concerned).
+        """
 
-            # Key format: root.child1...childN.@.Component<name>
-            object_class = key.split('@.')[1].split('<')[0]
+        if self.__class_names is None:
+            return
+        added, removed = self.__scene_graph.refresh()
 
-            # Handle the VisualStyle object
-            if object_class == 'VisualStyle':
-                display_flags = sofa_object.displayFlags.value.split('  ')
-                # TODO: apply the display flags
+        # Free the visual objects of the removed components
+        for path, sofa_object in removed:
+            if (path, id(sofa_object)) in self.__scene_objects:
+                self.remove(object_id=self.__scene_objects.pop((path, id(sofa_object))))
 
-            # Check if a configuration exists for the object
-            elif object_class in self.__SOFA_OBJECTS:
-                data_wrapper = self.__SOFA_OBJECTS[object_class](sofa_object=sofa_object)
-                if display_models[data_wrapper.display_model]:
-                    func = self.__getattribute__(f'add_{data_wrapper.object_type}')
-                    idx = func(**data_wrapper.create())
-                    self.__factory.callbacks[idx] = data_wrapper
+        # Create the visual objects of the added components of the displayed categories
+        for path, sofa_object in added:
+            if sofa_object.getClassName() in self.__class_names:
+                self.__scene_objects[(path, id(sofa_object))] = self.__create(sofa_object=sofa_object)
@@ -1,3 +1,4 @@
+from typing import Optional, List
 import Sofa
 
 from SimRender.sofa.local.viewer import Viewer
@@ -6,10 +7,33 @@ from SimRender.sofa.remote import player
 
 class Player(Viewer):
 
-    def __init__(self, root_node: Sofa.Core.Node):
+    def __init__(self,
+                 root_node: Sofa.Core.Node,
+                 history_dir: Optional[str] = None,
+                 ram_budget: int = 512,
+                 record_stride: int = 1,
+                 record_period: Optional[float] = None,
+                 record_objects: Optional[List[int]] = None,
+                 record_fields: Optional[List[str]] = None):
         """
         This class manages a single remote viewer to render visual objects.
+
+        :param root_node: Root node of the SOFA scene graph.
+        :param history_dir: Directory of the history files (a temporary directory is used by default).
+        :param ram_budget: Maximum size in MB of the history loaded in RAM, the rest of the history being stored on
+                           disk.
+        :param record_stride: Number of simulation steps between two recorded steps.
+        :param record_period: Simulation time between two recorded steps (replaces the stride if the simulation time is
+                              given to render calls).
+        :param record_objects: Indices of the visual objects whose changes are recorded (all by default).
+        :param record_fields: Data fields whose changes are recorded (all by default). The other data fields only keep
+                              their initial value in the history.
         """
 
         super().__init__(root_node=root_node, sync=True)
         self._remote_script = player.__file__
+        self._remote_options.update(history_dir=history_dir, ram_budget=ram_budget,
+                                    record_objects=record_objects, record_fields=record_fields)
+
+        # The recorded steps are defined by the simulation process so that they do not depend on the rendering pace
+        self._set_recording(stride=record_stride, period=record_period)
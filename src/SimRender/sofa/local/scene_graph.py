@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Iterable, Iterator, Optional, Tuple
 from collections.abc import MutableMapping
 import Sofa
 
@@ -7,36 +7,125 @@ class SceneGraph:
 
     def __init__(self, root_node: Sofa.Core.Node):
         """
-        This class transforms a SOFA scene graph into a recursive dictionary that contains each node and each object.
+        This class indexes the nodes and the components of a SOFA scene graph. The scene graph is explored once (in
+        linear time) to build a flat path index, the parent / children arrays of the nodes and an index of the
+        components by class name. The index is only built again if the structure of the scene graph changed.
 
         :param root_node: The SOFA root node to explore.
         """
 
-        self.graph = GraphDict()
-        self.__explore_graph(root_node, 'root')
         self.root = root_node
+        self.__index()
 
-    def __explore_graph(self, node: Sofa.Core.Node, parent: str) -> None:
+    def __index(self) -> None:
+        """
+        Build the index of the scene graph.
         """
-        Create a new iteration in the dictionary for the current node.
 
-        :param node: The SOFA node to explore (root or child node).
-        :param parent: Name of the parent node (for child nodes only).
+        # Nodes of the scene graph with their parent and children indices (the parent of the root node is -1)
+        self.nodes: List[Sofa.Core.Node] = []
+        self.node_paths: List[str] = []
+        self.parents: List[int] = []
+        self.children: List[List[int]] = []
+
+        # Components of the scene graph with the index of their node
+        self.components: List[Sofa.Core.Object] = []
+        self.component_nodes: List[int] = []
+        self.component_paths: List[str] = []
+        self.class_names: List[str] = []
+        self.by_class: Dict[str, List[int]] = {}
+
+        # Flat store of the components with format {root.child1...childN.@.Component<name>: component}
+        self.graph = GraphDict()
+
+        # Structure of each node with format (number of components, names of the children)
+        self.__signatures: List[Tuple[Tuple[Tuple[str, int], ...], Tuple[Tuple[str, int], ...]]] = []
+
+        self.__explore_graph(self.root)
+
+    def __explore_graph(self, root_node: Sofa.Core.Node) -> None:
         """
+        Index the nodes (in depth-first order) and their components.
 
-        self.graph[parent] = {}
+        :param root_node: The SOFA root node to explore.
+        """
 
-        if len(node.objects) > 0:
-            components = {}
+        # Iterative depth-first exploration with format [(node, parent index, path)]
+        stack: List[Tuple[Sofa.Core.Node, int, str]] = [(root_node, -1, 'root')]
+        while len(stack) > 0:
+            node, parent, path = stack.pop()
+            idx = len(self.nodes)
+            self.nodes.append(node)
+            self.node_paths.append(path)
+            self.parents.append(parent)
+            self.children.append([])
+            self.__signatures.append(self.__signature(node))
+            if parent >= 0:
+                self.children[parent].append(idx)
+            self.graph.add_node(path)
+
+            # Index the components of the node
             for component in node.objects:
                 name, class_name = component.getName(), component.getClassName()
                 name = '...' if name == class_name else name
-                components[f'{class_name}<{name}>'] = component
-            self.graph[f'{parent}.@'] = components
+                self.graph[f'{path}.@.{class_name}<{name}>'] = component
+                self.by_class.setdefault(class_name, []).append(len(self.components))
+                self.components.append(component)
+                self.component_nodes.append(idx)
+                self.component_paths.append(f'{path}.@.{class_name}<{name}>')
+                self.class_names.append(class_name)
+
+            # The children are pushed in reverse order to be explored in the scene graph order
+            for child in reversed(list(node.children)):
+                stack.append((child, idx, f'{path}.{child.name.value}'))
+
+    @staticmethod
+    def __signature(node: Sofa.Core.Node) -> Tuple[Tuple[Tuple[str, int], ...], Tuple[Tuple[str, int], ...]]:
+        """
+        Get the structure of a node with format (components, children), each one identified by its name and by its
+        Python object (a node added or removed at runtime changes the structure of its parent). The indexed nodes and
+        components are referenced by the scene graph, so a replaced one cannot share the identity of the previous one.
+
+        :param node: SOFA node.
+        """
 
-        if len(node.children) > 0:
-            for child in node.children:
-                self.__explore_graph(child, child.name.value if parent is None else f'{parent}.{child.name.value}')
+        return (tuple((component.getName(), id(component)) for component in node.objects),
+                tuple((child.getName(), id(child)) for child in node.children))
+
+    def refresh(self) -> Tuple[List[Tuple[str, Sofa.Core.Object]], List[Tuple[str, Sofa.Core.Object]]]:
+        """
+        Check the structure of each indexed node, then index the scene graph again if some nodes or components were
+        added or removed at runtime. The components are compared by path and by identity, so that a component replaced
+        by another one with the same name is both removed and added.
+
+        :return: Added and removed components with format [(path, component)].
+        """
+
+        if all(self.__signature(node) == signature for node, signature in zip(self.nodes, self.__signatures)):
+            return [], []
+
+        previous = list(zip(self.component_paths, self.components))
+        self.__index()
+        current = list(zip(self.component_paths, self.components))
+        known = {(path, id(component)) for path, component in previous}
+        kept = {(path, id(component)) for path, component in current}
+        return ([(path, component) for path, component in current if (path, id(component)) not in known],
+                [(path, component) for path, component in previous if (path, id(component)) not in kept])
+
+    def find(self, class_names: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Sofa.Core.Object]]:
+        """
+        Iterate over the components of the scene graph (in the scene graph order), filtered by class names.
+
+        :param class_names: Class names of the components (all the components by default).
+        :return: Paths and components with format (root.child1...childN.@.Component<name>, component).
+        """
+
+        if class_names is None:
+            indices = range(len(self.components))
+        else:
+            indices = sorted(i for class_name in set(class_names) for i in self.by_class.get(class_name, []))
+        for i in indices:
+            yield self.component_paths[i], self.components[i]
 
     def __repr__(self) -> str:
         """
@@ -61,55 +150,100 @@ class SceneGraph:
         return desc
 
 
+def split_key(key: str) -> Tuple[str, str]:
+    """
+    Split a dotted path into the path of its parent and its name (the component names may contain dots).
+
+    :param key: Dotted path.
+    """
+
+    head, separator, tail = key.partition('.@.')
+    if separator != '':
+        return f'{head}.@', tail
+    parent, _, name = key.rpartition('.')
+    return parent, name
+
+
 class GraphDict(MutableMapping):
 
     def __init__(self):
-        self.__D = dict()
+        """
+        Flat mapping of dotted paths to values. The flat items are stored in insertion order with O(1) lookups, while
+        the direct children of each path are indexed to access a sub-tree as a nested dictionary.
+        """
+
+        # Flat items with format {path: value}
+        self.__items: Dict[str, Any] = {}
+
+        # Direct children of each node path with format {path: {child_name: None}} (ordered set)
+        self.__children: Dict[str, Dict[str, None]] = {'': {}}
 
     @property
-    def store(self):
-        return self.__D.copy()
+    def store(self) -> Dict[str, Any]:
+        return self.__nested('')
+
+    def add_node(self, key: str) -> None:
+        """
+        Add an empty node (and its parents) to the graph.
+
+        :param key: Dotted path of the node.
+        """
+
+        parent, name = split_key(key)
+        if key not in self.__children:
+            self.__children[key] = {}
+            if parent != '' and parent not in self.__children:
+                self.add_node(parent)
+            self.__children[parent][name] = None
+
+    def __nested(self, key: str) -> Dict[str, Any]:
+        """
+        Build the nested dictionary of a node.
+
+        :param key: Dotted path of the node.
+        """
+
+        prefix = '' if key == '' else f'{key}.'
+        return {name: self.__nested(f'{prefix}{name}') if f'{prefix}{name}' in self.__children
+                else self.__items[f'{prefix}{name}'] for name in self.__children[key]}
 
     def __getitem__(self, key: str):
-        keys = key.split('.')
-        _D = self.__D
-        for k in keys[:-1]:
-            _D = _D[k]
-        return _D[keys[-1]]
+        if key in self.__items:
+            return self.__items[key]
+        if key in self.__children:
+            return self.__nested(key)
+        raise KeyError(key)
 
     def __setitem__(self, key: str, value: Any):
-        keys = key.split('.')
-        _D = self.__D
-        for k in keys[:-1]:
-            _D = _D[k]
-        _D[keys[-1]] = value
+
+        # Nested dictionaries are flattened at insertion
+        if isinstance(value, dict):
+            self.add_node(key)
+            for name, item in value.items():
+                self[f'{key}.{name}'] = item
+            return
+        parent, name = split_key(key)
+        self.add_node(parent)
+        self.__children[parent][name] = None
+        self.__items[key] = value
 
     def __delitem__(self, key: str):
-        keys = key.split('.')
-        _D = self.__D
-        for k in keys[:-1]:
-            _D = _D[k]
-        del _D[keys[-1]]
+        if key not in self.__items and key not in self.__children:
+            raise KeyError(key)
+
+        # Remove the sub-tree of a node
+        for name in list(self.__children.get(key, {})):
+            del self[f'{key}.{name}']
+        self.__children.pop(key, None)
+        self.__items.pop(key, None)
+        parent, name = split_key(key)
+        self.__children[parent].pop(name, None)
 
     def __iter__(self):
-        return iter(self.__flatten())
+        return iter(self.__items)
 
     def __len__(self):
-        return len(self.__flatten())
+        return len(self.__items)
 
     def items(self):
-        return self.__flatten().items()
-
-    def __flatten(self):
-
-        def flat_dict(d, parent=None):
-            res = {}
-            for key, value in d.items():
-                key = key if parent is None else f'{parent}.{key}'
-                if isinstance(value, dict):
-                    res = {**res, **flat_dict(value, key)}
-                else:
-                    res[key] = value
-            return res
-
-        return flat_dict(self.__D)
+        return self.__items.items()
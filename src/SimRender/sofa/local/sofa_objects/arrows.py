@@ -7,11 +7,16 @@ from SimRender.sofa.local.sofa_objects.base import Object
 
 class ConstantForceField(Object):
 
+    object_type = 'arrows'
+    display_model = 'force_field'
+
     def __init__(self, sofa_object: Sofa.Core.Object):
 
         super().__init__(sofa_object=sofa_object)
-        self.object_type = 'arrows'
-        self.display_model = 'force_field'
+        self.tracked = {'positions': [self.sofa_node.getMechanicalState().getData('position'),
+                                      sofa_object.getData('indices')],
+                        'vectors': [sofa_object.getData('forces'), sofa_object.getData('showArrowSize')]}
+        self.dynamic = False
 
     def create(self) -> Dict[str, Any]:
 
@@ -24,5 +29,5 @@ class ConstantForceField(Object):
 
     def update(self) -> Dict[str, Any]:
 
-        return {'positions': self.sofa_node.getMechanicalState().getData('position').value[self.sofa_object.getData('indices').value],
+        return {'positions': self.sofa_node.getMechanicalState().getData('position').array()[self.sofa_object.getData('indices').value],
                 'vectors': self.sofa_object.getData('forces').value * self.sofa_object.getData('showArrowSize').value}
@@ -1,15 +1,49 @@
-from typing import Dict, Any
+from typing import Dict, List, Tuple, Callable, Any
 import Sofa
 
 
 class Object:
 
+    # Visual object type (mesh, points...) and display model category of the SOFA component
+    object_type = ''
+    display_model = ''
+
     def __init__(self, sofa_object: Sofa.Core.Object):
+        """
+        Representation of a SOFA component as a visual object.
+        The data fields returned by create() only are static. The per-step data fields returned by update() are
+        declared in 'tracked' with the SOFA Data fields they are computed from, so that they are skipped while these
+        Data fields are unchanged.
+
+        :param sofa_object: SOFA component to render.
+        """
 
         self.sofa_object: Sofa.Core.Object = sofa_object
         self.sofa_node: Sofa.Core.Node = sofa_object.getContext()
-        self.object_type = ''
-        self.display_model = ''
+
+        # SOFA Data fields read by the update method for each per-step data field
+        self.tracked: Dict[str, List[Sofa.Core.Data]] = {}
+
+        # If True, the update method returns data fields that are not tracked (they are updated at each step)
+        self.dynamic = True
+
+        # Values parsed from SOFA Data fields with format {name: (counter, value)}
+        self.__parsed: Dict[str, Tuple[int, Any]] = {}
+
+    def parse(self, data: Sofa.Core.Data, parser: Callable[[Any], Any]) -> Any:
+        """
+        Get a value computed from a SOFA Data field, the parser is only called again when the Data field changed.
+
+        :param data: SOFA Data field.
+        :param parser: Function computing the value from the Data field value.
+        """
+
+        counter = data.getCounter()
+        name = data.getName()
+        if data.isDirty() or name not in self.__parsed or self.__parsed[name][0] != counter:
+            value = parser(data.value)
+            self.__parsed[name] = (data.getCounter(), value)
+        return self.__parsed[name][1]
 
     def create(self) -> Dict[str, Any]:
         return {}
@@ -1,27 +1,43 @@
-from typing import Dict, Any
+from typing import Dict, List, Tuple, Any
 import Sofa
 
 from SimRender.sofa.local.sofa_objects.base import Object
 
 
+def parse_material(material: str) -> Tuple[List[float], float]:
+    """
+    Get the diffuse color and the opacity from an OglModel material.
+
+    :param material: Value of the material Data field.
+    """
+
+    color = material.split('Diffuse')[1].split('Ambient')[0].split(' ')[2: -1]
+    return [float(c) for c in color[:-1]], max(0.1, float(color[-1]))
+
+
 class OglModel(Object):
 
+    object_type = 'mesh'
+    display_model = 'visual_model'
+
     def __init__(self, sofa_object: Sofa.Core.Object):
 
         super().__init__(sofa_object=sofa_object)
-        self.object_type = 'mesh'
-        self.display_model = 'visual_model'
+        self.position = sofa_object.getData('position')
+        self.material = sofa_object.getData('material')
+        self.tracked = {'positions': [self.position], 'color': [self.material], 'alpha': [self.material]}
+        self.dynamic = False
 
     def create(self) -> Dict[str, Any]:
 
         cells = []
         for topology in ['triangles', 'quads']:
             cells += self.sofa_object.getData(topology).value.tolist()
-        color = self.sofa_object.getData('material').value.split('Diffuse')[1].split('Ambient')[0].split(' ')[2: -1]
-        return {'positions': self.sofa_object.getData('position').value,
+        color, alpha = self.parse(data=self.material, parser=parse_material)
+        return {'positions': self.position.value,
                 'cells': cells,
-                'color': [float(c) for c in color[:-1]],
-                'alpha': max(0.1, float(color[-1])),
+                'color': color,
+                'alpha': alpha,
                 'wireframe': False,
                 'line_width': 0.,
                 'texture_name': self.sofa_object.getData('texturename').value,
@@ -29,23 +45,27 @@ class OglModel(Object):
 
     def update(self) -> Dict[str, Any]:
 
-        color = self.sofa_object.getData('material').value.split('Diffuse')[1].split('Ambient')[0].split(' ')[2: -1]
-        return {'positions': self.sofa_object.getData('position').value,
-                'color': [float(c) for c in color[:-1]],
-                'alpha': max(0.1, float(color[-1]))}
+        # The material is only parsed again when its Data field changed
+        color, alpha = self.parse(data=self.material, parser=parse_material)
+        return {'positions': self.position.array(),
+                'color': color,
+                'alpha': alpha}
 
 
 class TriangleCollisionModel(Object):
 
+    object_type = 'mesh'
+    display_model = 'collision_model'
+
     def __init__(self, sofa_object: Sofa.Core.Object):
 
         super().__init__(sofa_object=sofa_object)
-        self.object_type = 'mesh'
-        self.display_model = 'collision_model'
+        self.tracked = {'positions': [self.sofa_node.getMechanicalState().getData('position')]}
+        self.dynamic = False
 
     def create(self) -> Dict[str, Any]:
 
-        return {'positions': self.sofa_node.getMechanicalState().getData('position').value,
+        return {'positions': self.sofa_node.getMechanicalState().getData('position').array(),
                 'cells': self.sofa_object.findLink('topology').getLinkedBase().getData('triangles').value,
                 'color': 'orange5',
                 'alpha': 1.,
@@ -54,20 +74,23 @@ class TriangleCollisionModel(Object):
 
     def update(self) -> Dict[str, Any]:
 
-        return {'positions': self.sofa_node.getMechanicalState().getData('position').value}
+        return {'positions': self.sofa_node.getMechanicalState().getData('position').array()}
 
 
 class LineCollisionModel(Object):
 
+    object_type = 'mesh'
+    display_model = 'collision_model'
+
     def __init__(self, sofa_object: Sofa.Core.Object):
 
         super().__init__(sofa_object=sofa_object)
-        self.object_type = 'mesh'
-        self.display_model = 'collision_model'
+        self.tracked = {'positions': [self.sofa_node.getMechanicalState().getData('position')]}
+        self.dynamic = False
 
     def create(self) -> Dict[str, Any]:
 
-        return {'positions': self.sofa_node.getMechanicalState().getData('position').value,
+        return {'positions': self.sofa_node.getMechanicalState().getData('position').array(),
                 'cells': self.sofa_object.findLink('topology').getLinkedBase().getData('edges').value,
                 'color': 'orange5',
                 'alpha': 1.,
@@ -76,4 +99,4 @@ class LineCollisionModel(Object):
 
     def update(self) -> Dict[str, Any]:
 
-        return {'positions': self.sofa_node.getMechanicalState().getData('position').value}
+        return {'positions': self.sofa_node.getMechanicalState().getData('position').array()}
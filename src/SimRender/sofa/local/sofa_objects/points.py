@@ -6,11 +6,14 @@ from SimRender.sofa.local.sofa_objects.base import Object
 
 class PointCollisionModel(Object):
 
+    object_type = 'points'
+    display_model = 'collision_model'
+
     def __init__(self, sofa_object: Sofa.Core.Object):
 
         super().__init__(sofa_object=sofa_object)
-        self.object_type = 'points'
-        self.display_model = 'collision_model'
+        self.tracked = {'positions': [self.sofa_node.getMechanicalState().getData('position')]}
+        self.dynamic = False
 
     def create(self) -> Dict[str, Any]:
 
@@ -21,40 +24,45 @@ class PointCollisionModel(Object):
 
     def update(self) -> Dict[str, Any]:
 
-        return {'positions': self.sofa_node.getMechanicalState().getData('position').value}
+        return {'positions': self.sofa_node.getMechanicalState().getData('position').array()}
 
 
 class MechanicalObject(Object):
 
+    object_type = 'points'
+    display_model = 'behavior_model'
+
     def __init__(self, sofa_object: Sofa.Core.Object):
 
         super().__init__(sofa_object=sofa_object)
-        self.object_type = 'points'
-        self.display_model = 'behavior_model'
+        self.tracked = {'positions': [sofa_object.getData('position')]}
+        self.dynamic = False
 
     def create(self) -> Dict[str, Any]:
 
-        return {'positions': self.sofa_object.getData('position').value,
+        return {'positions': self.sofa_object.getData('position').array(),
                 'color': 'grey5',
                 'alpha': 0.5,
                 'point_size': 3}
 
     def update(self) -> Dict[str, Any]:
 
-        return {'positions': self.sofa_object.getData('position').value}
+        return {'positions': self.sofa_object.getData('position').array()}
 
 
 class FixedProjectiveConstraint(Object):
 
+    object_type = 'points'
+    display_model = 'behavior_model'
+
     def __init__(self, sofa_object: Sofa.Core.Object):
 
         super().__init__(sofa_object=sofa_object)
-        self.object_type = 'points'
-        self.display_model = 'behavior_model'
+        self.dynamic = False
 
     def create(self) -> Dict[str, Any]:
 
-        pos = self.sofa_node.getMechanicalState().getData('position').value[self.sofa_object.getData('indices').value, :3]
+        pos = self.sofa_node.getMechanicalState().getData('position').array()[self.sofa_object.getData('indices').value, :3]
         return {'positions': pos,
                 'color': 'red5',
                 'alpha': 0.9,
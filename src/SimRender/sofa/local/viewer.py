@@ -1,15 +1,24 @@
-from typing import Optional
+from typing import Optional, Tuple, Dict, Any
 from threading import Thread
 import Sofa
 
 from SimRender.core.local.viewer import Viewer as _Viewer
 from SimRender.sofa.local.factory import Factory, Objects
+from SimRender.sofa.local.controller import RenderController
 from SimRender.sofa.remote import viewer
 
 
 class Viewer(_Viewer):
 
-    def __init__(self, root_node: Sofa.Core.Node, sync: bool = False):
+    def __init__(self,
+                 root_node: Sofa.Core.Node,
+                 sync: bool = False,
+                 offscreen: bool = False,
+                 output: Optional[str] = None,
+                 resolution: Tuple[int, int] = (1280, 720),
+                 stride: int = 1,
+                 capture_images: bool = False,
+                 batch_lag: int = 0):
         """
         This class manages a single remote viewer to render SOFA objects.
 
@@ -17,13 +26,33 @@ class Viewer(_Viewer):
         :param sync: If True, the rendering step will block the python code execution. Otherwise, the viewer will only
                      render the current status of the simulation. Use it if you want to make sure that all your
                      simulation steps are rendered.
+        :param offscreen: If True, the rendering is performed without any window (headless mode for clusters or CI).
+        :param output: Path to a directory (PNG sequence) or to a video file (mp4, avi...) to write the rendered frames.
+        :param resolution: Size of the rendered frames in headless mode or with images capture.
+        :param stride: Number of simulation steps between two written frames.
+        :param capture_images: If True, the rendered images can be returned to the simulation with capture(). The
+                               rendering window then keeps the defined resolution.
+        :param batch_lag: In batch mode with sync, maximum number of steps between the simulation and the rendering.
+                          Only the simulations visible in the batch viewer wait for the rendering.
         """
 
         # Create a Factory to manage visual objects and remote communication
-        self.__factory = Factory(root_node=root_node, sync=sync)
+        self.__factory = Factory(root_node=root_node, sync=sync,
+                                 capture_size=resolution if capture_images else None, batch_lag=batch_lag)
         self.__subprocess: Optional[Thread] = None
         self._remote_script = viewer.__file__
 
+        # Options of the remote viewer (headless mode and frames writing)
+        self._remote_options = {'offscreen': offscreen, 'output': output, 'stride': stride}
+        if offscreen or capture_images:
+            self._remote_options['size'] = list(resolution)
+
+        # Optional SOFA controller that triggers the rendering at the end of the animation steps (its settings are kept
+        # while the controller is only in the scene graph between launch and shutdown)
+        self.__root_node = root_node
+        self.__auto_render_options: Optional[Dict[str, Any]] = None
+        self.__controller: Optional[RenderController] = None
+
     @property
     def objects(self) -> Objects:
         """
@@ -31,3 +60,67 @@ class Viewer(_Viewer):
         """
 
         return self.__factory.objects
+
+    @property
+    def timings(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Get the time spent in the data wrapper callback of each visual object with format {object_id: {'name': name,
+        'calls': number of calls, 'time': total time in seconds}}.
+        """
+
+        return self.__factory.timings
+
+    def auto_render(self, steps: int = 1, max_fps: Optional[float] = None, period: Optional[float] = None) -> None:
+        """
+        Render the simulation automatically at the end of the animation steps with a SOFA controller, render() is then
+        not required anymore. The enabled throttling policies are combined.
+
+        :param steps: Number of simulation steps between two rendered steps.
+        :param max_fps: If defined, maximum number of rendered steps per second (wall time).
+        :param period: If defined, simulation time between two rendered steps.
+        """
+
+        self.__auto_render_options = {'steps': steps, 'max_fps': max_fps, 'period': period}
+
+        # The controller is added to the scene graph once the viewer is launched
+        if self.__controller is not None:
+            self.__remove_controller()
+            self.__add_controller()
+
+    def __add_controller(self) -> None:
+        """
+        Add the rendering controller to the scene graph if the automatic rendering is enabled.
+        """
+
+        if self.__auto_render_options is not None:
+            self.__controller = RenderController(root_node=self.__root_node, render=self.__auto_render,
+                                                 **self.__auto_render_options)
+            self.__root_node.addObject(self.__controller)
+
+    def __remove_controller(self) -> None:
+        """
+        Remove the rendering controller from the scene graph.
+        """
+
+        if self.__controller is not None:
+            self.__root_node.removeObject(self.__controller)
+            self.__controller = None
+
+    def __auto_render(self) -> None:
+        """
+        Rendering function of the SOFA controller (the steps are not rendered anymore once the viewer is closed).
+        """
+
+        if self.is_open:
+            self.render()
+
+    def launch(self, batch_key: Optional[Tuple[int, int]] = None) -> None:
+
+        super().launch(batch_key=batch_key)
+        self.__add_controller()
+
+    def shutdown(self) -> None:
+
+        # The controller is removed before the communication is closed (the automatic rendering settings are kept)
+        self.__remove_controller()
+        super().shutdown()
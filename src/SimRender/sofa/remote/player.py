@@ -49,7 +49,8 @@ if __name__ == '__main__':
 
     # Executed code when the visualization process is launched
     from sys import argv
-    Player(socket_port=int(argv[1])).launch()
+    from json import loads
+    Player(socket_port=int(argv[1]), **loads(argv[2])).launch()
 
     # app = QApplication([])
     # win = PlayerQt(socket_port=int(argv[1]))
@@ -56,4 +56,5 @@ if __name__ == '__main__':
 
     # Executed code when the visualization process is launched
     from sys import argv
-    Viewer(socket_port=int(argv[1])).launch()
+    from json import loads
+    Viewer(socket_port=int(argv[1]), **loads(argv[2])).launch()
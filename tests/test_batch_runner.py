@@ -0,0 +1,54 @@
+from os import environ
+from threading import Thread
+import numpy as np
+import pytest
+
+from SimRender.core import BatchRunner
+
+
+class PointsSimulation:
+
+    def __init__(self, index: int):
+        """
+        Minimal simulation of the batch: a cloud of points translated at each step.
+
+        :param index: Index of the simulation in the batch (seed of the points).
+        """
+
+        self.positions = np.random.default_rng(seed=index).random((20, 3))
+        self.viewer = None
+
+    def init_viewer(self, viewer) -> None:
+
+        self.viewer = viewer
+        self.viewer.objects.add_points(positions=self.positions)
+
+    def step(self) -> None:
+
+        self.positions += 0.01
+        self.viewer.objects.update_points(object_id=0, positions=self.positions)
+
+
+def test_rendered_batch_with_fewer_processes():
+    """
+    The simulations that reached their number of steps release their process slot without waiting for the rendering
+    window to be closed, so that the remaining simulations of the batch are launched.
+    """
+
+    pytest.importorskip('PySide6')
+    environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    nb_simu, nb_steps = 3, 10
+    runner = BatchRunner(simulation=PointsSimulation, nb_simu=nb_simu, processes=1, render=True)
+    runner.start(nb_steps=nb_steps)
+
+    # Wait for the simulations in a thread so that a blocked batch fails the test instead of hanging
+    result = {}
+    waiting = Thread(target=lambda: result.update(errors=runner.wait()), daemon=True)
+    waiting.start()
+    waiting.join(timeout=120)
+    assert not waiting.is_alive(), f'The batch is blocked with steps {runner.steps}.'
+    runner.stop(close_window=True)
+
+    assert result['errors'] == {}
+    assert runner.steps == [nb_steps] * nb_simu